@@ -1,13 +1,21 @@
 import os
 import time
 import asyncio
-import instaloader
 import random
+import threading
+import uuid
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
+from urllib.parse import urlparse, parse_qs
 import re
 from logger_config import setup_logger
-from communicator import WebSocketCommunicator, MediaType, MediaItem, FetchResult
+from communicator import (
+    WebSocketCommunicator, MediaType, MediaItem, FetchResult, AdaptiveLimiter, Hedger, JobCancelled,
+    iterate_in_executor, run_in_executor, check_cancelled, startup_timings
+)
+import profiling
+# instaloader is heavy to import, it is loaded lazily together with the loader (see get_loader)
 
 # Instagram credentials
 IG_USERNAME = os.getenv("IG_USERNAME")
@@ -17,9 +25,29 @@ IG_PASSWORD = os.getenv("IG_PASSWORD")
 VERSION = "A6"  # Updated version with improved error handling
 MAX_RETRIES = 3
 RETRY_DELAY = 2
-MAX_WORKERS = 2  # Reduced to avoid Instagram rate limits
+INITIAL_WORKERS = 2  # Starting concurrency, kept low to avoid Instagram rate limits
+MIN_WORKERS = int(os.getenv("IGLINKER_MIN_WORKERS", "1"))  # Concurrency floor
+MAX_WORKERS = int(os.getenv("IGLINKER_MAX_WORKERS", "4"))  # Concurrency ceiling (executor size)
 SESSION_LIFETIME = 3600  # Reset session after 1 hour
 
+# Time budget per content class (seconds), the job is cancelled once it runs out
+JOB_DEADLINES = {
+    "story": int(os.getenv("IGLINKER_DEADLINE_STORY", "60")),
+    "post": int(os.getenv("IGLINKER_DEADLINE_POST", "120")),
+    "reel": int(os.getenv("IGLINKER_DEADLINE_REEL", "180")),
+}
+
+# Media delivery routing: big or short-lived CDN URLs are downloaded and sent as file:// (needs local Telegram server)
+DOWNLOAD_FOLDER = os.getenv("DOWNLOAD_FOLDER")  # Routing is enabled when the shared download folder is set
+URL_MAX_SIZE = {
+    MediaType.PHOTO: int(os.getenv("IGLINKER_URL_MAX_PHOTO_SIZE", str(5 * 1024**2))),  # Bot API limit for photos by URL
+    MediaType.VIDEO: int(os.getenv("IGLINKER_URL_MAX_VIDEO_SIZE", str(20 * 1024**2))),  # Bot API limit for files by URL
+}
+URL_MIN_TTL = int(os.getenv("IGLINKER_URL_MIN_TTL", "600"))  # Download URLs that expire sooner than this (seconds)
+PROBE_TIMEOUT = 10
+PROBE_WORKERS = 8  # CDN probes and downloads, separate from the rate-limited Instagram API workers
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+CONTENT_TYPE_EXTENSIONS = {"video/mp4": "mp4", "image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
 
 # Setup logger for this module
 logger = setup_logger("instagram.linker")
@@ -27,42 +55,131 @@ logger = setup_logger("instagram.linker")
 # Thread pool for parallel operations
 executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
 
-# Configure instaloader with optimized settings
-LOADER = instaloader.Instaloader()
-LOADER.context.max_connection_attempts = 3
-LOADER.context.sleep = lambda: time.sleep(random.uniform(1.0, 3.0))  # Increased delay
+# Adaptive limit of concurrent Instagram API jobs, backs off when Instagram starts failing or slowing down
+limiter = AdaptiveLimiter("instagram", INITIAL_WORKERS, MIN_WORKERS, MAX_WORKERS)
+
+# Thread pool for CDN probes and downloads
+probe_executor = ThreadPoolExecutor(max_workers=PROBE_WORKERS)
+
+# Instaloader instance, created on first use or by background warm-up
+LOADER = None
+_loader_lock = threading.RLock()
+
+# Optional hedging of post metadata requests (HEDGE_METADATA), second attempts use their own session
+metadata_hedger = Hedger("instagram_metadata", workers=MAX_WORKERS * 2)
+_hedge_loader = None
+_hedge_loader_source = None  # Main loader the hedge loader's session was copied from
 
 # Session management
 last_login_time = 0
+_http_adapter_factory = None  # Set by the multi-platform host to share connection pools
+
+def _create_loader():
+    """Create instaloader instance with optimized settings"""
+    import instaloader
+    loader = instaloader.Instaloader()
+    loader.context.max_connection_attempts = 3
+    loader.context.sleep = lambda: time.sleep(random.uniform(1.0, 3.0))  # Increased delay
+    return loader
+
+# Reusable HTTP session for CDN requests
+_session = None
+def get_http_session():
+    """Lazily create and return a shared requests.Session for CDN probes and downloads"""
+    global _session
+    if _session is None:
+        import requests
+        _session = requests.Session()
+        if _http_adapter_factory:
+            adapter = _http_adapter_factory()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+    return _session
+
+def _cancel_response_hook(response, *args, **kwargs):
+    """requests hook stopping instaloader between requests once the job is cancelled"""
+    check_cancelled()
+    return response
+
+def _setup_session(loader) -> None:
+    """
+    Route instaloader session through the shared connection pool, if the host provides one,
+    and let every response check the job's cancel token
+    """
+    session = getattr(loader.context, "_session", None)
+    if session is None:
+        return
+    session.hooks["response"].append(_cancel_response_hook)
+    if _http_adapter_factory:
+        adapter = _http_adapter_factory()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
 
 def initialize_loader(force_new=False) -> None:
     """Initialize a fresh Instagram session."""
     global LOADER, last_login_time
     
-    current_time = time.time()
-    
-    # Only create new session if forced or session expired
-    if not force_new and last_login_time > 0 and (current_time - last_login_time) < SESSION_LIFETIME:
-        logger.debug("Using existing session")
-        return
+    with _loader_lock:
+        current_time = time.time()
         
-    # Create new loader with optimized settings
-    LOADER = instaloader.Instaloader()
-    LOADER.context.max_connection_attempts = 3
-    LOADER.context.sleep = lambda: time.sleep(random.uniform(1.0, 3.0))
-    
-    if not IG_USERNAME or not IG_PASSWORD:
-        logger.warning("No credentials found. Working anonymously.")
-        return
+        # Only create new session if forced or session expired
+        if not force_new and last_login_time > 0 and (current_time - last_login_time) < SESSION_LIFETIME:
+            logger.debug("Using existing session")
+            return
+            
+        # Create new loader with optimized settings, published only after login
+        loader = _create_loader()
         
-    try:
-        logger.info(f"Logging in as {IG_USERNAME}...")
-        LOADER.login(IG_USERNAME, IG_PASSWORD)
-        last_login_time = time.time()
-        logger.info("Logged in successfully.")
-    except Exception as e:
-        logger.error(f"Login failed: {e}")
-        logger.warning("Continuing without credentials...")
+        if not IG_USERNAME or not IG_PASSWORD:
+            logger.warning("No credentials found. Working anonymously.")
+            _setup_session(loader)
+            LOADER = loader
+            return
+            
+        try:
+            logger.info(f"Logging in as {IG_USERNAME}...")
+            loader.login(IG_USERNAME, IG_PASSWORD)
+            last_login_time = time.time()
+            logger.info("Logged in successfully.")
+        except Exception as e:
+            logger.error(f"Login failed: {e}")
+            logger.warning("Continuing without credentials...")
+        _setup_session(loader)
+        LOADER = loader
+
+def get_loader():
+    """Return the shared loader, initializing it on first use (blocks until warm-up is done)"""
+    if LOADER is None:
+        with _loader_lock:
+            if LOADER is None:
+                initialize_loader()
+    return LOADER
+
+def job_deadline(post_url: str) -> float:
+    """Time budget of a URL by its content class"""
+    if "/stories/" in post_url:
+        return JOB_DEADLINES["story"]
+    return JOB_DEADLINES["reel" if "/reel/" in post_url else "post"]
+
+def get_hedge_loader(loader):
+    """Second loader with a copy of the main loader's session (own connections and rate controller)"""
+    global _hedge_loader, _hedge_loader_source
+    with _loader_lock:
+        if _hedge_loader is None or _hedge_loader_source is not loader:
+            hedge_loader = _create_loader()
+            if loader.context.is_logged_in:
+                hedge_loader.load_session(loader.context.username, loader.save_session())
+            _setup_session(hedge_loader)
+            _hedge_loader, _hedge_loader_source = hedge_loader, loader
+        return _hedge_loader
+
+def fetch_post(loader, shortcode: str):
+    """Fetch post metadata, hedged with the second session when enabled"""
+    import instaloader
+    return metadata_hedger.call(
+        lambda: instaloader.Post.from_shortcode(loader.context, shortcode),
+        lambda: instaloader.Post.from_shortcode(get_hedge_loader(loader).context, shortcode),
+    )
 
 # Extract URL patterns once at module level
 URL_PATTERNS = {
@@ -77,71 +194,82 @@ def extract_id_from_url(post_url: str, pattern_key: str) -> str:
     match = URL_PATTERNS[pattern_key].search(post_url)
     return match.group(1) if match else ""
 
-def _fetch_media_items_sync(post_url: str) -> list[MediaItem]:
+def _iter_media_items_sync(post_url: str):
     """
-    Extract media items from Instagram posts with optimized processing.
+    Yield media items from Instagram posts one by one as they are resolved.
+    Errors other than metadata fetch failures are propagated to the caller.
     """
-    media_items: list[MediaItem] = []
+    import instaloader
+    loader = get_loader()
+    check_cancelled()
     
-    try:
-        # Handle story URLs
-        if "/stories/" in post_url:
-            logger.debug(f"Processing Instagram story: {post_url}")
-            story_id_str = extract_id_from_url(post_url, "story_id")
-            if not story_id_str:
-                story_id_str = post_url.rstrip("/").split("/")[-1].split("?")[0]
-                logger.debug(f"Extracted story ID using fallback: {story_id_str}")
-                
-            try:
-                story_id = int(story_id_str)
-                logger.debug(f"Fetching story with ID: {story_id}")
-                story_item = instaloader.StoryItem.from_mediaid(LOADER.context, story_id)
-                
-                # Don't download to disk, just get the URL
-                media_type = MediaType.VIDEO if story_item.is_video else MediaType.PHOTO
-                media_url = story_item.video_url if story_item.is_video else story_item.url
-                logger.debug(f"Retrieved story {media_type.value}: {media_url}")
-                media_items.append(MediaItem(type=media_type, url=media_url))
-            except instaloader.exceptions.BadResponseException as e:
-                logger.error(f"Story fetch error: {e}")
-                # No retry for stories as they're ephemeral
-                return []
-
-        else:
-            # Handle posts and reels
-            post_shortcode = ""
-            if "/p/" in post_url:
-                logger.debug(f"Processing Instagram post: {post_url}")
-                post_shortcode = extract_id_from_url(post_url, "post_shortcode")
-            elif "/reel/" in post_url:
-                logger.debug(f"Processing Instagram reel: {post_url}")
-                post_shortcode = extract_id_from_url(post_url, "reel_shortcode")
+    # Handle story URLs
+    if "/stories/" in post_url:
+        logger.debug(f"Processing Instagram story: {post_url}")
+        story_id_str = extract_id_from_url(post_url, "story_id")
+        if not story_id_str:
+            story_id_str = post_url.rstrip("/").split("/")[-1].split("?")[0]
+            logger.debug(f"Extracted story ID using fallback: {story_id_str}")
             
-            if not post_shortcode:
-                post_shortcode = post_url.split('/')[-2]
-                logger.debug(f"Extracted shortcode using fallback: {post_shortcode}")
+        try:
+            story_id = int(story_id_str)
+            logger.debug(f"Fetching story with ID: {story_id}")
+            story_item = instaloader.StoryItem.from_mediaid(loader.context, story_id)
+        except instaloader.exceptions.BadResponseException as e:
+            logger.error(f"Story fetch error: {e}")
+            # No retry for stories as they're ephemeral
+            return
             
-            try:    
-                logger.debug(f"Fetching post with shortcode: {post_shortcode}")
-                post = instaloader.Post.from_shortcode(LOADER.context, post_shortcode)
-
-                # Handle different post types with optimized collection
-                if post.typename == "GraphSidecar":
-                    logger.debug(f"Processing carousel post with {sum(1 for _ in post.get_sidecar_nodes())} items")
-                    for node in post.get_sidecar_nodes():
-                        media_type = MediaType.VIDEO if node.is_video else MediaType.PHOTO
-                        media_url = node.video_url if node.is_video else node.display_url
-                        logger.debug(f"Added carousel item {media_type.value}: {media_url}")
-                        media_items.append(MediaItem(type=media_type, url=media_url))
-                else:
-                    media_type = MediaType.VIDEO if post.is_video else MediaType.PHOTO
-                    media_url = post.video_url if post.is_video else post.url
-                    logger.debug(f"Added single {media_type.value}: {media_url}")
-                    media_items.append(MediaItem(type=media_type, url=media_url))
-            except instaloader.exceptions.BadResponseException as e:
-                logger.error(f"Post metadata fetch failed: {e}")
-                return []
+        # Don't download to disk, just get the URL
+        media_type = MediaType.VIDEO if story_item.is_video else MediaType.PHOTO
+        media_url = story_item.video_url if story_item.is_video else story_item.url
+        logger.debug(f"Retrieved story {media_type.value}: {media_url}")
+        yield MediaItem(type=media_type, url=media_url)
+        return
+
+    # Handle posts and reels
+    post_shortcode = ""
+    if "/p/" in post_url:
+        logger.debug(f"Processing Instagram post: {post_url}")
+        post_shortcode = extract_id_from_url(post_url, "post_shortcode")
+    elif "/reel/" in post_url:
+        logger.debug(f"Processing Instagram reel: {post_url}")
+        post_shortcode = extract_id_from_url(post_url, "reel_shortcode")
+    
+    if not post_shortcode:
+        post_shortcode = post_url.split('/')[-2]
+        logger.debug(f"Extracted shortcode using fallback: {post_shortcode}")
+    
+    try:    
+        logger.debug(f"Fetching post with shortcode: {post_shortcode}")
+        post = fetch_post(loader, post_shortcode)
+    except instaloader.exceptions.BadResponseException as e:
+        logger.error(f"Post metadata fetch failed: {e}")
+        return
+
+    # Handle different post types, yielding carousel items as they are resolved
+    if post.typename == "GraphSidecar":
+        logger.debug(f"Processing carousel post with {post.mediacount} items")
+        for node in post.get_sidecar_nodes():
+            check_cancelled()
+            media_type = MediaType.VIDEO if node.is_video else MediaType.PHOTO
+            media_url = node.video_url if node.is_video else node.display_url
+            logger.debug(f"Added carousel item {media_type.value}: {media_url}")
+            yield MediaItem(type=media_type, url=media_url)
+    else:
+        media_type = MediaType.VIDEO if post.is_video else MediaType.PHOTO
+        media_url = post.video_url if post.is_video else post.url
+        logger.debug(f"Added single {media_type.value}: {media_url}")
+        yield MediaItem(type=media_type, url=media_url)
 
+def _fetch_media_items_sync(post_url: str) -> list[MediaItem]:
+    """
+    Extract media items from Instagram posts with optimized processing.
+    """
+    try:
+        media_items = list(_iter_media_items_sync(post_url))
+    except JobCancelled:
+        raise
     except Exception as e:
         logger.error(f"Error fetching media items: {e}", exc_info=True)
         return []
@@ -150,18 +278,109 @@ def _fetch_media_items_sync(post_url: str) -> list[MediaItem]:
     return media_items
 
 
+def url_expires_at(url: str) -> float | None:
+    """Expiry timestamp of a signed Instagram CDN URL ('oe' parameter, hex)"""
+    oe = parse_qs(urlparse(url).query).get("oe")
+    try:
+        return float(int(oe[0], 16)) if oe else None
+    except ValueError:
+        return None
+
+def _probe_media(url: str) -> tuple[int | None, str]:
+    """HEAD request for size and content type of a CDN URL"""
+    response = get_http_session().head(url, allow_redirects=True, timeout=PROBE_TIMEOUT)
+    response.raise_for_status()
+    length = response.headers.get("Content-Length")
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+    return (int(length) if length and length.isdigit() else None), content_type
+
+def _download_media(url: str, content_type: str) -> str:
+    """Stream a CDN file into DOWNLOAD_FOLDER and return its path"""
+    os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
+    extension = CONTENT_TYPE_EXTENSIONS.get(content_type, "bin")
+    file_path = os.path.join(DOWNLOAD_FOLDER, f"instagram_{uuid.uuid4().hex[:8]}.{extension}")
+    part_path = file_path + ".part"
+    try:
+        with get_http_session().get(url, stream=True, timeout=PROBE_TIMEOUT) as response:
+            response.raise_for_status()
+            with open(part_path, "wb") as f:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    check_cancelled()
+                    f.write(chunk)
+        os.replace(part_path, file_path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return file_path
+
+def _route_media_item_sync(item: MediaItem) -> MediaItem:
+    """Keep the CDN URL, or download the file when it is too big or expires too soon for Telegram"""
+    if item.type not in URL_MAX_SIZE or not item.url.startswith("http"):
+        return item
+    
+    try:
+        size, content_type = _probe_media(item.url)
+    except Exception as e:
+        logger.warning(f"Probe failed, keeping URL: {e}")
+        return item
+    
+    expires_at = url_expires_at(item.url)
+    too_big = size is not None and size > URL_MAX_SIZE[item.type]
+    short_lived = expires_at is not None and expires_at - time.time() < URL_MIN_TTL
+    if not too_big and not short_lived:
+        return item
+    
+    reason = f"size {size} bytes" if too_big else f"URL expires in {int(expires_at - time.time())}s"
+    try:
+        file_path = _download_media(item.url, content_type)
+    except Exception as e:
+        logger.warning(f"Download failed ({reason}), keeping URL: {e}")
+        return item
+    logger.info(f"Delivering {item.type.value} as local file ({reason}): {file_path}")
+    return MediaItem(type=item.type, url=f"file://{file_path}")
+
+def _discard_local_files(media_items: list[MediaItem]) -> None:
+    """Remove files downloaded for a result that will not be sent"""
+    for item in media_items:
+        if item.url.startswith("file://") and os.path.exists(item.url[len("file://"):]):
+            os.remove(item.url[len("file://"):])
+
+async def route_media_item(item: MediaItem) -> MediaItem:
+    """Asynchronous wrapper for _route_media_item_sync (no-op without DOWNLOAD_FOLDER)"""
+    if not DOWNLOAD_FOLDER:
+        return item
+    # A download finishing after the caller gave up is removed right away
+    return await run_in_executor(
+        probe_executor, _route_media_item_sync, item,
+        on_abandoned=lambda routed: _discard_local_files([routed] if routed else [])
+    )
+
+async def route_media_items(media_items: list[MediaItem]) -> list[MediaItem]:
+    """Probe all items concurrently and route each one to URL or local-file delivery, keeping order"""
+    if not DOWNLOAD_FOLDER:
+        return media_items
+    tasks = [asyncio.ensure_future(route_media_item(item)) for item in media_items]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except asyncio.CancelledError:
+        # Items routed before the cancellation would never be sent
+        _discard_local_files([task.result() for task in tasks if task.done() and not task.cancelled() and not task.exception()])
+        raise
+
 async def fetch_media_items(post_url: str) -> FetchResult:
     """
     Fetch media with optimized async handling and exponential backoff.
     """
     for attempt in range(MAX_RETRIES):
         try:
+            check_cancelled()
             logger.info(f"Fetching media from URL: {post_url} (attempt {attempt+1}/{MAX_RETRIES})")
             
-            # Use the executor for CPU-bound operations
-            media_items = await asyncio.get_running_loop().run_in_executor(
-                executor, _fetch_media_items_sync, post_url
-            )
+            # Use the executor for CPU-bound operations, within the adaptive limit
+            async with limiter.slot() as slot:
+                media_items = await run_in_executor(executor, _fetch_media_items_sync, post_url)
+                # _fetch_media_items_sync logs errors and returns nothing
+                slot.failed = not media_items
             
             if not media_items and attempt < MAX_RETRIES - 1:
                 retry_delay_actual = RETRY_DELAY * (2 ** attempt)
@@ -170,14 +389,24 @@ async def fetch_media_items(post_url: str) -> FetchResult:
                 # If this isn't the first attempt, try refreshing the session
                 if attempt > 0:
                     logger.info("Refreshing Instagram session before retry")
-                    initialize_loader(force_new=True)
+                    # Login blocks, other platforms of a linker host share the event loop
+                    await run_in_executor(executor, initialize_loader, True)
                     
                 await asyncio.sleep(retry_delay_actual)
                 continue
                 
             logger.info(f"Successfully retrieved {len(media_items)} media items")
-            return FetchResult(media=media_items) 
-            
+            media_items = await route_media_items(media_items)
+            try:
+                check_cancelled()
+            except JobCancelled:
+                _discard_local_files(media_items)
+                raise
+            return FetchResult(media=media_items)
+        
+        except JobCancelled as e:
+            logger.warning(f"{e}: {post_url}")
+            return FetchResult(media=[], error="Request timed out")
         except Exception as e:
             error_message = str(e)
             logger.error(f"Error fetching media: {error_message}", exc_info=True)
@@ -185,7 +414,7 @@ async def fetch_media_items(post_url: str) -> FetchResult:
             # Handle 403 errors with refreshed session
             if ("403 Forbidden" in error_message or "login_required" in error_message) and attempt < MAX_RETRIES - 1:
                 logger.warning(f"403 Forbidden error detected. Refreshing session and retrying...")
-                initialize_loader(force_new=True)
+                await run_in_executor(executor, initialize_loader, True)
                 retry_delay_actual = RETRY_DELAY * (2 ** attempt)
                 await asyncio.sleep(retry_delay_actual)
                 continue
@@ -196,18 +425,77 @@ async def fetch_media_items(post_url: str) -> FetchResult:
     logger.error("Maximum retry attempts reached")
     return FetchResult(media=[], error="Maximum retry attempts reached") 
 
+async def stream_media_items(post_url: str):
+    """
+    Streaming variant of fetch_media_items used in streaming response mode.
+    Carousel items are routed concurrently as soon as each one is resolved,
+    and yielded in order once routed.
+    """
+    logger.info(f"Streaming media from URL: {post_url}")
+    routing: deque = deque()
+    try:
+        async with limiter.slot():
+            async for item in iterate_in_executor(executor, _iter_media_items_sync, post_url):
+                routing.append(asyncio.create_task(route_media_item(item)))
+                while routing and routing[0].done():
+                    yield routing.popleft().result()
+        while routing:
+            yield await routing[0]
+            routing.popleft()
+    finally:
+        # Stream abandoned: stop pending probes, drop files of items that will not be sent
+        for task in routing:
+            task.cancel()
+        routed = [task.result() for task in routing if task.done() and not task.cancelled() and not task.exception()]
+        _discard_local_files(routed)
+
+def warm_up() -> None:
+    """Import instaloader and log in ahead of the first request"""
+    get_loader()
+    logger.info("Instagram loader warm-up finished")
+
+async def warm_up_async() -> None:
+    """Run warm-up in the executor without blocking the event loop"""
+    await asyncio.get_running_loop().run_in_executor(executor, warm_up)
+
+def share_resources(shared_executor=None, http_adapter_factory=None, max_workers: int | None = None) -> None:
+    """
+    Use executor and HTTP connection pools shared with other platforms (multi-platform host).
+    max_workers is the shared thread budget: the concurrency ceiling, batch concurrency and
+    probe and hedge pools are scaled down to it.
+    """
+    global executor, _http_adapter_factory, MAX_WORKERS, limiter, metadata_hedger, probe_executor
+    if shared_executor:
+        executor = shared_executor
+    if http_adapter_factory:
+        _http_adapter_factory = http_adapter_factory
+    if max_workers:
+        MAX_WORKERS = min(MAX_WORKERS, max_workers)
+        limiter = AdaptiveLimiter("instagram", min(INITIAL_WORKERS, MAX_WORKERS), MIN_WORKERS, MAX_WORKERS)
+        metadata_hedger = Hedger("instagram_metadata", workers=MAX_WORKERS)
+    if max_workers and max_workers < PROBE_WORKERS:
+        probe_executor.shutdown(wait=False)  # Not used yet, no threads were started
+        probe_executor = ThreadPoolExecutor(max_workers=max_workers)
+
+def create_communicator() -> WebSocketCommunicator:
+    """Create communicator registering this linker as the instagram platform"""
+    # Register with tgbot first, loader initialization (login) runs in background afterwards
+    return WebSocketCommunicator(
+        platform_name="instagram",
+        fetch_function=fetch_media_items,
+        stream_function=stream_media_items,
+        warmup_function=warm_up_async,
+        batch_concurrency=MAX_WORKERS,
+        deadline_function=job_deadline
+    )
+
 async def main() -> None:
     """Main function using WebSocketCommunicator."""
-    # Initialize loader once at startup
-    initialize_loader()
-    
     logger.info(f"iglinker v. {VERSION} starting up")
+    startup_timings.mark("imports")
+    await profiling.install("instagram")
     
-    # Create WebSocketCommunicator instance
-    communicator = WebSocketCommunicator(
-        platform_name="instagram",
-        fetch_function=fetch_media_items
-    )
+    communicator = create_communicator()
     
     # Run the communicator
     logger.info("Starting WebSocket communicator")
@@ -221,6 +509,7 @@ if __name__ == "__main__":
         logger.info("Received keyboard interrupt, shutting down")
         # Properly shutdown the executor
         executor.shutdown(wait=True)
+        probe_executor.shutdown(wait=True)
         logger.info("Executor shutdown, exiting")
     except Exception as e:
         logger.critical(f"Unhandled exception: {e}", exc_info=True)
@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from typing import List, Optional
+from urllib.parse import urlparse, parse_qs
+from logger_config import setup_logger
+from communicator import metrics
+
+# Logger configuration
+logger = setup_logger("profiling")
+
+# Constants
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")  # Where profiles are written
+DEFAULT_PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "30"))  # Session length when started by signal
+MAX_PROFILE_SECONDS = 600
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.01"))  # Seconds between stack samples
+TRACEMALLOC_FRAMES = 10  # Stack depth recorded per allocation
+TRACEMALLOC_TOP = 50  # Allocation sites listed in the diff
+CONTROL_HOST = os.getenv("PROFILE_CONTROL_HOST", "127.0.0.1")
+CONTROL_PORT = os.getenv("PROFILE_CONTROL_PORT")  # HTTP control endpoint, disabled when not set
+
+class Profiler:
+    """
+    On-demand profiling session of the whole process.
+
+    While a session runs, a sampler thread records the stacks of all threads
+    (event loop and executors) as flamegraph-compatible collapsed stacks,
+    cProfile traces the event loop thread and tracemalloc records allocations.
+    Nothing runs between sessions.
+    """
+
+    def __init__(self, tag: str, output_dir: str = PROFILE_DIR, sample_interval: float = SAMPLE_INTERVAL):
+        self.tag = tag
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.started_at: Optional[float] = None
+        self._samples: Counter = Counter()
+        self._sample_count = 0
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_sampling = threading.Event()
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._tracemalloc_started = False
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._stop_handle: Optional[asyncio.TimerHandle] = None
+        self._writing: Optional[asyncio.Task] = None  # Results of the last session being written
+        self.control_server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether a session is in progress"""
+        return self.started_at is not None
+
+    def _sample_stacks(self) -> None:
+        """Sampler thread: count the current stack of every other thread"""
+        own_ident = threading.get_ident()
+        while not self._stop_sampling.wait(self.sample_interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    name = getattr(code, "co_qualname", code.co_name)
+                    stack.append(f"{name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self._samples[";".join(reversed(stack))] += 1
+            self._sample_count += 1
+
+    def start(self, seconds: float = DEFAULT_PROFILE_SECONDS) -> bool:
+        """Start a session of the given length (call from the event loop thread)"""
+        if self.running or (self._writing and not self._writing.done()):
+            return False
+        seconds = min(max(seconds, 1), MAX_PROFILE_SECONDS)
+
+        self._samples.clear()
+        self._sample_count = 0
+        self._stop_sampling.clear()
+        self._sampler = threading.Thread(target=self._sample_stacks, name="profile-sampler", daemon=True)
+        self._sampler.start()
+
+        self._cprofile = cProfile.Profile()
+        self._cprofile.enable()
+
+        self._tracemalloc_started = not tracemalloc.is_tracing()
+        if self._tracemalloc_started:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._snapshot = tracemalloc.take_snapshot()
+
+        self.started_at = time.time()
+        self._stop_handle = asyncio.get_running_loop().call_later(seconds, self.stop)
+        metrics.increment("profile_sessions")
+        logger.info(f"Profiling for {seconds:.0f}s, results go to {os.path.abspath(self.output_dir)}")
+        return True
+
+    def stop(self) -> Optional[asyncio.Task]:
+        """
+        Stop the session (call from the event loop thread). Its results are
+        written in the default executor, the returned task gives the paths.
+        """
+        if not self.running:
+            return None
+        if self._stop_handle:
+            self._stop_handle.cancel()
+            self._stop_handle = None
+
+        self._cprofile.disable()
+        self._stop_sampling.set()
+        started_at, self.started_at = self.started_at, None
+        loop = asyncio.get_running_loop()
+        self._writing = loop.create_task(self._write_results(loop, started_at, time.time() - started_at))
+        return self._writing
+
+    async def _write_results(self, loop: asyncio.AbstractEventLoop, started_at: float, duration: float) -> List[str]:
+        """Sampler join, allocation diff and file writes would block the event loop"""
+        try:
+            return await loop.run_in_executor(None, self._finish, started_at, duration)
+        except Exception:
+            logger.exception("Writing profiling results failed")
+            raise
+
+    def _finish(self, started_at: float, duration: float) -> List[str]:
+        """Collect the stopped session and write its results, returns the written paths"""
+        self._sampler.join()
+        snapshot = tracemalloc.take_snapshot()
+        if self._tracemalloc_started:
+            tracemalloc.stop()
+
+        prefix = os.path.join(
+            self.output_dir, f"{self.tag}_{time.strftime('%Y%m%d_%H%M%S', time.localtime(started_at))}"
+        )
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        paths = [
+            self._write_pstats(prefix + ".pstats"),
+            self._write_collapsed(prefix + ".collapsed"),
+            self._write_allocations(prefix + ".tracemalloc.txt", snapshot, duration),
+        ]
+        logger.info(f"Profiling finished after {duration:.1f}s ({self._sample_count} samples): {', '.join(paths)}")
+        return paths
+
+    def _write_pstats(self, path: str) -> str:
+        """Event loop thread profile, readable with pstats or snakeviz"""
+        self._cprofile.dump_stats(path)
+        self._cprofile = None
+        return path
+
+    def _write_collapsed(self, path: str) -> str:
+        """Stack samples of all threads in collapsed format (flamegraph.pl, speedscope)"""
+        with open(path, "w") as f:
+            for stack, count in self._samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def _write_allocations(self, path: str, snapshot: tracemalloc.Snapshot, duration: float) -> str:
+        """Allocation sites that grew the most during the session"""
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        diff = snapshot.filter_traces(ignore).compare_to(self._snapshot.filter_traces(ignore), "lineno")
+        self._snapshot = None
+        with open(path, "w") as f:
+            f.write(f"tracemalloc diff over {duration:.1f}s, top {TRACEMALLOC_TOP} allocation sites by growth\n\n")
+            for stat in diff[:TRACEMALLOC_TOP]:
+                f.write(f"{stat}\n")
+        return path
+
+    def status(self) -> dict:
+        """Current session state"""
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "samples": self._sample_count if self.running else 0,
+            "output_dir": os.path.abspath(self.output_dir),
+        }
+
+    async def _handle_control(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Minimal HTTP control endpoint: /profile/start?seconds=N, /profile/stop, /profile, /metrics"""
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # Headers are not needed
+
+            target = urlparse(request_line[1] if len(request_line) > 1 else "/")
+            params = parse_qs(target.query)
+            code, body = 200, {}
+            if target.path == "/profile/start":
+                seconds = float(params.get("seconds", [DEFAULT_PROFILE_SECONDS])[0])
+                body = {"started": self.start(seconds), **self.status()}
+            elif target.path == "/profile/stop":
+                writing = self.stop()
+                body = {"files": await writing if writing else []}
+            elif target.path == "/profile":
+                body = self.status()
+            elif target.path == "/metrics":
+                body = metrics.snapshot()
+            else:
+                code, body = 404, {"error": "Not found"}
+        except Exception as e:
+            logger.exception("Profiling control request failed")
+            code, body = 500, {"error": str(e)}
+
+        payload = json.dumps(body).encode()
+        writer.write(
+            f"HTTP/1.1 {code} {'OK' if code == 200 else 'Error'}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode()
+            + payload
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+async def install(tag: str) -> Profiler:
+    """
+    Make profiling available in this process: SIGUSR1 starts a session of
+    PROFILE_SECONDS, SIGUSR2 stops it early, and PROFILE_CONTROL_PORT (if set)
+    serves the HTTP control endpoint.
+    """
+    profiler = Profiler(tag)
+    loop = asyncio.get_running_loop()
+
+    if hasattr(signal, "SIGUSR1"):
+        loop.add_signal_handler(signal.SIGUSR1, profiler.start)
+        loop.add_signal_handler(signal.SIGUSR2, profiler.stop)
+        logger.debug("Profiling signals installed (SIGUSR1 start, SIGUSR2 stop)")
+
+    if CONTROL_PORT:
+        profiler.control_server = await asyncio.start_server(profiler._handle_control, CONTROL_HOST, int(CONTROL_PORT))
+        logger.info(f"Profiling control endpoint on http://{CONTROL_HOST}:{CONTROL_PORT}/profile")
+    return profiler
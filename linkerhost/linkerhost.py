@@ -0,0 +1,85 @@
+import os
+import sys
+import asyncio
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# Outside of Docker the linker modules live in sibling folders
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _folder in ("ytlinker", "iglinker"):
+    _path = os.path.join(_ROOT, _folder)
+    if os.path.isdir(_path) and _path not in sys.path:
+        sys.path.append(_path)
+
+from logger_config import setup_logger, configure_logging
+from communicator import startup_timings
+import profiling
+
+# Logger configuration
+configure_logging()
+logger = setup_logger("linker.host")
+
+# Constants
+VERSION = "A1"
+PLATFORM_MODULES = {
+    "youtube": "ytlinker",
+    "instagram": "iglinker",
+}
+ENV_PLATFORMS = "LINKER_PLATFORMS"
+DEFAULT_PLATFORMS = ",".join(PLATFORM_MODULES)
+MAX_WORKERS = int(os.getenv("HOST_MAX_WORKERS", "6"))  # Shared by all platforms
+HTTP_POOL_SIZE = int(os.getenv("HOST_HTTP_POOL_SIZE", str(MAX_WORKERS * 2)))  # Connections kept per host
+
+# Thread pool shared by all platforms
+executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
+@lru_cache(maxsize=1)
+def shared_http_adapter():
+    """Lazily create one HTTP adapter (connection pool) mounted on every platform session"""
+    from requests.adapters import HTTPAdapter
+    return HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+
+def selected_platforms() -> list[str]:
+    """Platforms to host, from environment (comma separated)"""
+    platforms = []
+    for name in os.getenv(ENV_PLATFORMS, DEFAULT_PLATFORMS).split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in PLATFORM_MODULES:
+            logger.error(f"Unknown platform '{name}', supported: {', '.join(PLATFORM_MODULES)}")
+            continue
+        platforms.append(name)
+    return platforms
+
+async def main() -> None:
+    """Load platform linkers and run one communicator per platform on a single event loop"""
+    logger.info(f"linker host v. {VERSION}")
+    await profiling.install("linkerhost")
+    
+    communicators = []
+    for platform in selected_platforms():
+        module = importlib.import_module(PLATFORM_MODULES[platform])
+        module.share_resources(shared_executor=executor, http_adapter_factory=shared_http_adapter, max_workers=MAX_WORKERS)
+        communicators.append(module.create_communicator())
+        logger.info(f"Loaded {platform} linker")
+    startup_timings.mark("imports")
+    
+    if not communicators:
+        logger.critical("No platforms to host")
+        return
+    
+    logger.info(f"Starting {len(communicators)} WebSocket communicators")
+    await asyncio.gather(*(communicator.run() for communicator in communicators))
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Received keyboard interrupt, shutting down")
+        # Properly shutdown the executor
+        executor.shutdown(wait=True)
+        logger.info("Executor shutdown, exiting")
+    except Exception as e:
+        logger.critical(f"Unhandled exception: {e}", exc_info=True)
@@ -8,35 +8,41 @@ namespace TikTok_bot
     internal class NecessaryRegex
     {
         /// <summary>
-        /// Извлекает ссылку на TikTok из переданного текста.
+        /// Возвращает все совпадения регулярного выражения в тексте без повторов, в порядке появления.
         /// </summary>
-        /// <param name="text">Текст, в котором ищется ссылка на TikTok.</param>
-        /// <returns>Возвращает найденную ссылку TikTok или пустую строку, если ссылка не найдена.</returns>
-        public static string ExtractTikTokUrl(string text)
+        private static List<string> MatchAll(Regex regex, string text)
+        {
+            return regex.Matches(text).Select(match => match.Value.Trim()).Distinct().ToList();
+        }
+
+        /// <summary>
+        /// Извлекает ссылки на TikTok из переданного текста.
+        /// </summary>
+        /// <param name="text">Текст, в котором ищутся ссылки на TikTok.</param>
+        /// <returns>Возвращает найденные ссылки TikTok без повторов (пустой список, если ссылок нет).</returns>
+        public static List<string> ExtractTikTokUrls(string text)
         {
             Regex regex = new(@"https?:\/\/(www\.)?(vt\.tiktok\.com\/[\w\-]+\/?|vm\.tiktok\.com\/[\w\-]+\/?|tiktok\.com\/@[A-Za-z0-9_.-]+\/video\/\d+(\?[^ \n\r\t]*)?)", RegexOptions.IgnoreCase);
-            Match match = regex.Match(text);
-            return match.Success ? match.Value.Trim() : "";
+            return MatchAll(regex, text);
         }
 
         /// <summary>
-        /// Извлекает ссылку на Instagram из переданного текста.
+        /// Извлекает ссылки на Instagram из переданного текста.
         /// </summary>
-        /// <param name="text">Текст, в котором ищется ссылка на Instagram.</param>
-        /// <returns>Возвращает найденную ссылку Instagram или пустую строку, если ссылка не найдена.</returns>
-        public static string ExtractInstagramUrl(string text)
+        /// <param name="text">Текст, в котором ищутся ссылки на Instagram.</param>
+        /// <returns>Возвращает найденные ссылки Instagram без повторов (пустой список, если ссылок нет).</returns>
+        public static List<string> ExtractInstagramUrls(string text)
         {
             Regex regex = new(@"https?:\/\/(www\.)?instagram\.com\/[A-Za-z0-9_\.\-\/\?\=&]+", RegexOptions.IgnoreCase);
-            Match match = regex.Match(text);
-            return match.Success ? match.Value.Trim() : "";
+            return MatchAll(regex, text);
         }
 
         /// <summary>
-        /// Извлекает ссылку на YouTube из переданного текста.
+        /// Извлекает ссылки на YouTube из переданного текста.
         /// </summary>
-        /// <param name="text">Текст, в котором ищется ссылка на YouTube.</param>
-        /// <returns>Возвращает найденную ссылку YouTube или пустую строку, если ссылка не найдена.</returns>
-        public static string ExtractYouTubeUrl(string text)
+        /// <param name="text">Текст, в котором ищутся ссылки на YouTube.</param>
+        /// <returns>Возвращает найденные ссылки YouTube без повторов (пустой список, если ссылок нет).</returns>
+        public static List<string> ExtractYouTubeUrls(string text)
         {
             // regex to match additional YouTube URL patterns:
             // 1. Standard videos: youtube.com/watch?v=ID
@@ -45,6 +51,17 @@ namespace TikTok_bot
             // 4. Channel community posts: youtube.com/channel/CHANNEL_ID/community
             // 5. Short links: youtu.be/ID
             Regex regex = new(@"https?:\/\/(www\.)?(youtube\.com\/watch\?v=[A-Za-z0-9_-]+|youtube\.com\/shorts\/[A-Za-z0-9_-]+|youtube\.com\/community\/[A-Za-z0-9_-]+|youtube\.com\/post\/[A-Za-z0-9_-]+|youtube\.com\/channel\/[A-Za-z0-9_-]+\/community|youtu\.be\/[A-Za-z0-9_-]+)([&?\/][A-Za-z0-9_=.-]+)*", RegexOptions.IgnoreCase);
+            return MatchAll(regex, text);
+        }
+
+        /// <summary>
+        /// Извлекает ссылку на плейлист YouTube из переданного текста.
+        /// </summary>
+        /// <param name="text">Текст, в котором ищется ссылка на плейлист.</param>
+        /// <returns>Возвращает найденную ссылку на плейлист или пустую строку, если ссылка не найдена.</returns>
+        public static string ExtractYouTubePlaylistUrl(string text)
+        {
+            Regex regex = new(@"https?:\/\/(www\.|m\.)?youtube\.com\/playlist\?list=[A-Za-z0-9_-]+", RegexOptions.IgnoreCase);
             Match match = regex.Match(text);
             return match.Success ? match.Value.Trim() : "";
         }
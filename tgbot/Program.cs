@@ -32,6 +32,10 @@ class Program
     const int CLEANUP_INTERVAL_SECONDS = 3600;  // How often to check for stale files   
     // ---------------------------------
 
+    // --- Request Routing Configuration ---
+    const int REQUEST_ROUTE_TTL_SECONDS = 21600; // How long replies to a link are still delivered (resumed jobs, buffered results)
+    // -------------------------------------
+
     // --- Logging Configuration ---
     const string LOG_LEVEL_ENV_VAR = "LOG_LEVEL";
     const LogLevel DEFAULT_LOG_LEVEL = LogLevel.INFO;
@@ -103,6 +107,7 @@ class Program
     static readonly Dictionary<WebSocket, string> clientPlatforms = [];
     static readonly Dictionary<WebSocket, long> clientChatIds = [];
     static readonly Dictionary<WebSocket, Update?> clientUpdates = [];
+    static readonly RequestRoutes requestRoutes = new(TimeSpan.FromSeconds(REQUEST_ROUTE_TTL_SECONDS));
           
     static async Task Main()
     {
@@ -167,7 +172,7 @@ class Program
             {
                 HttpListenerWebSocketContext wsContext = await context.AcceptWebSocketAsync(null);
                 WebSocket ws = wsContext.WebSocket;
-                _ = WebSocketServer.HandleWebSocket(ws, clients, clientPlatforms, clientChatIds, clientUpdates, bot, isUsingLocalTGServer);
+                _ = WebSocketServer.HandleWebSocket(ws, clients, clientPlatforms, clientChatIds, clientUpdates, requestRoutes, bot, isUsingLocalTGServer);
             }
             else
             {
@@ -209,31 +214,36 @@ class Program
                 }
             }
 
-            string tiktokLink = NecessaryRegex.ExtractTikTokUrl(messageText);
-            string instagramLink = NecessaryRegex.ExtractInstagramUrl(messageText);
-            string youtubeLink = NecessaryRegex.ExtractYouTubeUrl(messageText);
+            List<string> tiktokLinks = NecessaryRegex.ExtractTikTokUrls(messageText);
+            List<string> instagramLinks = NecessaryRegex.ExtractInstagramUrls(messageText);
+            List<string> youtubeLinks = NecessaryRegex.ExtractYouTubeUrls(messageText);
+            string youtubePlaylist = NecessaryRegex.ExtractYouTubePlaylistUrl(messageText);
 
-            if (!string.IsNullOrEmpty(tiktokLink) || !string.IsNullOrEmpty(instagramLink) || !string.IsNullOrEmpty(youtubeLink))
+            if (tiktokLinks.Count > 0 || instagramLinks.Count > 0 || youtubeLinks.Count > 0 || !string.IsNullOrEmpty(youtubePlaylist))
             {
                 Logger.Info($"User: {sender}, Link: {messageText}");
 
+                // One ID per message, shared by all replicas of a platform
+                string requestId = requestRoutes.Register(chatId, update);
+
                 foreach (var ws in clients)
                 {
                     if (ws.State == WebSocketState.Open)
                     {
                         if (clientPlatforms.TryGetValue(ws, out string? platform))
                         {
-                            if (!string.IsNullOrEmpty(tiktokLink) && platform == "tiktok")
+                            // Several links of a platform (or a playlist) go to its linker as one batch request
+                            if (tiktokLinks.Count > 0 && platform == "tiktok")
                             {
-                                await Sending.SendLinkToClient(ws, tiktokLink, chatId, update, clientPlatforms, clientChatIds, clientUpdates);
+                                await Sending.SendLinkToClient(ws, tiktokLinks, chatId, update, clientPlatforms, clientChatIds, clientUpdates, requestId, requestRoutes);
                             }
-                            else if (!string.IsNullOrEmpty(instagramLink) && platform == "instagram")
+                            else if (instagramLinks.Count > 0 && platform == "instagram")
                             {
-                                await Sending.SendLinkToClient(ws, instagramLink, chatId, update, clientPlatforms, clientChatIds, clientUpdates);
+                                await Sending.SendLinkToClient(ws, instagramLinks, chatId, update, clientPlatforms, clientChatIds, clientUpdates, requestId, requestRoutes);
                             }
-                            else if (!string.IsNullOrEmpty(youtubeLink) && platform == "youtube")
+                            else if ((youtubeLinks.Count > 0 || !string.IsNullOrEmpty(youtubePlaylist)) && platform == "youtube")
                             {
-                                await Sending.SendLinkToClient(ws, youtubeLink, chatId, update, clientPlatforms, clientChatIds, clientUpdates);
+                                await Sending.SendLinkToClient(ws, youtubeLinks, chatId, update, clientPlatforms, clientChatIds, clientUpdates, requestId, requestRoutes, youtubePlaylist);
                             }
                         }
                     }
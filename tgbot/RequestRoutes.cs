@@ -0,0 +1,104 @@
+﻿using System.Collections.Concurrent;
+using System.Net.WebSockets;
+using Telegram.Bot.Types;
+
+namespace TikTok_bot
+{
+    /// <summary>
+    /// Класс, связывающий идентификаторы запросов, отправленных линкерам, с чатом, из которого пришла ссылка.
+    /// Ответ с полем request_id доставляется в чат своего запроса, даже если он пришёл по новому соединению
+    /// или после того, как через то же соединение ушли ссылки других пользователей.
+    /// </summary>
+    internal class RequestRoutes
+    {
+        private record Route(long ChatId, Update Update, DateTime Created);
+
+        // How often expired routes are removed
+        private static readonly TimeSpan PruneInterval = TimeSpan.FromMinutes(1);
+
+        private readonly ConcurrentDictionary<string, Route> _routes = new();
+        private readonly ConcurrentDictionary<WebSocket, bool> _routedClients = new();
+        private readonly TimeSpan _ttl;
+        private DateTime _lastPrune = DateTime.UtcNow;
+
+        /// <summary>
+        /// Инициализирует новый экземпляр класса RequestRoutes.
+        /// </summary>
+        /// <param name="ttl">Сколько времени ответ на запрос ещё может быть доставлен.</param>
+        public RequestRoutes(TimeSpan ttl)
+        {
+            _ttl = ttl;
+        }
+
+        /// <summary>
+        /// Отмечает клиента, который принимает запросы в виде JSON {"id", "url"} и возвращает id в ответах.
+        /// </summary>
+        /// <param name="ws">WebSocket соединение клиента.</param>
+        public void AddClient(WebSocket ws) => _routedClients[ws] = true;
+
+        /// <summary>
+        /// Удаляет отметку клиента после отключения.
+        /// </summary>
+        /// <param name="ws">WebSocket соединение клиента.</param>
+        public void RemoveClient(WebSocket ws) => _routedClients.TryRemove(ws, out _);
+
+        /// <summary>
+        /// Проверяет, возвращает ли клиент идентификаторы запросов в ответах.
+        /// </summary>
+        /// <param name="ws">WebSocket соединение клиента.</param>
+        /// <returns>True, если ответы клиента маршрутизируются по request_id.</returns>
+        public bool IsRoutedClient(WebSocket ws) => _routedClients.ContainsKey(ws);
+
+        /// <summary>
+        /// Регистрирует запрос для сообщения пользователя.
+        /// </summary>
+        /// <param name="chatId">ID чата пользователя.</param>
+        /// <param name="update">Обновление с сообщением пользователя.</param>
+        /// <returns>Идентификатор запроса, одинаковый для всех линкеров, получивших ссылку.</returns>
+        public string Register(long chatId, Update update)
+        {
+            Prune();
+            string requestId = $"{chatId}_{update.Message?.Id ?? update.Id}";
+            _routes[requestId] = new Route(chatId, update, DateTime.UtcNow);
+            return requestId;
+        }
+
+        /// <summary>
+        /// Находит чат и обновление, к которым относится запрос.
+        /// </summary>
+        /// <param name="requestId">Идентификатор запроса из ответа линкера.</param>
+        /// <param name="chatId">ID чата пользователя.</param>
+        /// <param name="update">Обновление с сообщением пользователя.</param>
+        /// <returns>True, если запрос известен и ещё не устарел.</returns>
+        public bool TryGet(string requestId, out long chatId, out Update? update)
+        {
+            if (_routes.TryGetValue(requestId, out Route? route) && DateTime.UtcNow - route.Created < _ttl)
+            {
+                chatId = route.ChatId;
+                update = route.Update;
+                return true;
+            }
+
+            chatId = 0;
+            update = null;
+            return false;
+        }
+
+        /// <summary>
+        /// Удаляет устаревшие запросы (не чаще одного раза в PruneInterval).
+        /// </summary>
+        private void Prune()
+        {
+            DateTime now = DateTime.UtcNow;
+            if (now - _lastPrune < PruneInterval)
+                return;
+            _lastPrune = now;
+
+            foreach (var pair in _routes)
+            {
+                if (now - pair.Value.Created >= _ttl)
+                    _routes.TryRemove(pair.Key, out _);
+            }
+        }
+    }
+}
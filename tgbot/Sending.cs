@@ -1,5 +1,6 @@
 ﻿using System.Net.WebSockets;
 using System.Text;
+using System.Text.Json.Nodes;
 using Telegram.Bot.Types;
 
 namespace TikTok_bot
@@ -10,35 +11,63 @@ namespace TikTok_bot
     internal class Sending
     {
         /// <summary>
-        /// Отправляет ссылку через WebSocket клиенту.
+        /// Отправляет ссылки через WebSocket клиенту.
         /// </summary>
-        /// <param name="ws">WebSocket, через который отправляется ссылка.</param>
-        /// <param name="link">Ссылка, которая отправляется клиенту.</param>
+        /// <param name="ws">WebSocket, через который отправляются ссылки.</param>
+        /// <param name="links">Ссылки из сообщения, которые отправляются клиенту.</param>
         /// <param name="chatId">Идентификатор чата Telegram для отправки.</param>
         /// <param name="update">Обновление, содержащее информацию о сообщении пользователя.</param>
         /// <param name="clientPlatforms">Словарь, содержащий платформы для каждого клиента WebSocket.</param>
         /// <param name="clientChatIds">Словарь, содержащий идентификаторы чатов для каждого клиента WebSocket.</param>
         /// <param name="clientUpdates">Словарь, содержащий обновления для каждого клиента WebSocket.</param>
+        /// <param name="requestId">Идентификатор запроса, по которому доставляются ответы клиента.</param>
+        /// <param name="requestRoutes">Клиенты, возвращающие идентификатор запроса в ответах.</param>
+        /// <param name="playlist">Ссылка на плейлист, если она есть в сообщении.</param>
         /// <returns>Задача, представляющая асинхронную операцию отправки данных.</returns>
         public static async Task SendLinkToClient(
             WebSocket ws,
-            string link,
+            List<string> links,
             long chatId,
             Update update,
             Dictionary<WebSocket, string> clientPlatforms,
             Dictionary<WebSocket, long> clientChatIds,
-            Dictionary<WebSocket, Update?> clientUpdates)
+            Dictionary<WebSocket, Update?> clientUpdates,
+            string requestId,
+            RequestRoutes requestRoutes,
+            string? playlist = null)
         {
-            // Обновляем словари с информацией о клиенте
+            // Обновляем словари с информацией о клиенте (ответы без request_id идут в последний чат соединения)
             clientChatIds[ws] = chatId;
             clientUpdates[ws] = update;
 
+            // Clients that echo request IDs get {"id", "url" | "urls" | "playlist"}, the others the first plain link
+            string message;
+            if (requestRoutes.IsRoutedClient(ws))
+            {
+                var request = new JsonObject { ["id"] = requestId };
+                if (links.Count == 1 && string.IsNullOrEmpty(playlist))
+                    request["url"] = links[0];
+                else if (links.Count > 0)
+                    request["urls"] = new JsonArray(links.Select(link => (JsonNode?)link).ToArray());
+                if (!string.IsNullOrEmpty(playlist))
+                    request["playlist"] = playlist;
+                message = request.ToJsonString();
+            }
+            else if (links.Count > 0)
+            {
+                message = links[0];
+            }
+            else
+            {
+                return;
+            }
+
             // Преобразуем ссылку в байты и отправляем через WebSocket
-            byte[] data = Encoding.UTF8.GetBytes(link);
+            byte[] data = Encoding.UTF8.GetBytes(message);
             await ws.SendAsync(new ArraySegment<byte>(data), WebSocketMessageType.Text, true, CancellationToken.None);
 
             // Логируем информацию о том, что ссылка была отправлена
-            Logger.Info($"Sent link to {clientPlatforms[ws]} client for chat ID: {chatId}");
+            Logger.Info($"Sent link to {clientPlatforms[ws]} client for chat ID: {chatId} (request {requestId})");
 
         }
       
@@ -93,6 +93,60 @@ namespace TikTok_bot
             return user == null || user.IsActive;
         }
 
+        /// <summary>
+        /// Определяет чат, в который нужно доставить ответ клиента.
+        /// Ответы с известным request_id идут в чат своего запроса, остальные в последний чат соединения.
+        /// </summary>
+        /// <param name="ws">WebSocket соединение клиента.</param>
+        /// <param name="receivedData">Ответ клиента.</param>
+        /// <param name="clientChatIds">Словарь, связывающий WebSocket с идентификатором чата клиента.</param>
+        /// <param name="clientUpdates">Словарь, связывающий WebSocket с обновлениями от клиента.</param>
+        /// <param name="requestRoutes">Чаты запросов, отправленных клиентам.</param>
+        /// <param name="chatId">ID чата, в который доставляется ответ.</param>
+        /// <param name="update">Обновление с сообщением пользователя.</param>
+        /// <returns>True, если получатель найден.</returns>
+        private static bool TryGetRecipient(
+            WebSocket ws,
+            string receivedData,
+            Dictionary<WebSocket, long> clientChatIds,
+            Dictionary<WebSocket, Update?> clientUpdates,
+            RequestRoutes requestRoutes,
+            out long chatId,
+            out Update? update)
+        {
+            string? requestId = null;
+            try
+            {
+                using var json = JsonDocument.Parse(receivedData);
+                if (json.RootElement.ValueKind == JsonValueKind.Object &&
+                    json.RootElement.TryGetProperty("request_id", out JsonElement idElement) &&
+                    idElement.ValueKind == JsonValueKind.String)
+                {
+                    requestId = idElement.GetString();
+                }
+            }
+            catch (JsonException)
+            {
+                // Not JSON, reported by the caller
+            }
+
+            if (requestId != null && requestRoutes.TryGet(requestId, out chatId, out update))
+                return true;
+
+            if (requestRoutes.IsRoutedClient(ws))
+            {
+                // The socket's last chat may belong to another request, never guess
+                if (requestId != null)
+                    Logger.Warning($"Dropped reply to unknown or expired request {requestId}");
+                chatId = 0;
+                update = null;
+                return false;
+            }
+
+            update = null;
+            return clientChatIds.TryGetValue(ws, out chatId) && clientUpdates.TryGetValue(ws, out update);
+        }
+
         /// <summary>
         /// Обрабатывает подключение WebSocket клиента, получает и отправляет данные через WebSocket.
         /// </summary>
@@ -101,6 +155,7 @@ namespace TikTok_bot
         /// <param name="clientPlatforms">Словарь, связывающий WebSocket с платформой клиента.</param>
         /// <param name="clientChatIds">Словарь, связывающий WebSocket с идентификатором чата клиента.</param>
         /// <param name="clientUpdates">Словарь, связывающий WebSocket с обновлениями от клиента.</param>
+        /// <param name="requestRoutes">Чаты запросов, отправленных клиентам.</param>
         /// <param name="bot">Объект Telegram бота для отправки сообщений и медиа.</param>
         /// <param name="isUsingLocalTGServer">Флаг, указывающий, используется ли локальный сервер Telegram.</param>
         /// <returns>Задача, представляющая асинхронную операцию обработки соединения.</returns>
@@ -110,6 +165,7 @@ namespace TikTok_bot
             Dictionary<WebSocket, string> clientPlatforms,
             Dictionary<WebSocket, long> clientChatIds,
             Dictionary<WebSocket, Update?> clientUpdates,
+            RequestRoutes requestRoutes,
             ITelegramBotClient bot,
             bool isUsingLocalTGServer = false)  // Add parameter to check if using local server
         {
@@ -121,9 +177,15 @@ namespace TikTok_bot
 
             if (registrationData.StartsWith("platform:"))
             {
-                string platform = registrationData.Split(':')[1].Trim().ToLower();
+                // platform:<name>[:ids], "ids" marks clients that echo request IDs in their replies
+                string[] registration = registrationData.Split(':');
+                string platform = registration[1].Trim().ToLower();
                 clientPlatforms[ws] = platform;
-                Logger.Info("Client registered for platform: " + platform);
+                if (registration.Skip(2).Any(option => option.Trim().ToLower() == "ids"))
+                {
+                    requestRoutes.AddClient(ws);
+                }
+                Logger.Info("Client registered for platform: " + platform + (requestRoutes.IsRoutedClient(ws) ? " (request IDs)" : ""));
             }
             else
             {
@@ -140,11 +202,11 @@ namespace TikTok_bot
                     var receivedData = await ReceiveFullMessage(ws, buffer);
                     Logger.Debug("Received data: " + receivedData);
 
-                    if (clientChatIds.TryGetValue(ws, out long chatId))
+                    if (TryGetRecipient(ws, receivedData, clientChatIds, clientUpdates, requestRoutes, out long chatId, out Update? update))
                     {
                         try
                         {
-                            if (clientUpdates.TryGetValue(ws, out Update? update) && update != null)
+                            if (update != null)
                             {
                                 string sender = update.Message?.From?.Username ?? update.Message?.From?.FirstName ?? "Пользователь";
                                 var jsonData = JsonSerializer.Deserialize<JsonElement>(receivedData);
@@ -360,6 +422,11 @@ namespace TikTok_bot
                                         await bot.SendMessage(chatId, $"{errorMessage}");
                                         Logger.Info($"Sent error message to user: {sender}");
                                     }
+                                    else if (jsonData.TryGetProperty("done", out _))
+                                    {
+                                        // End-of-result marker of a streamed response, all parts were already sent
+                                        Logger.Debug($"Streamed result completed for user: {sender}");
+                                    }
                                     else
                                     {
                                         Logger.Warning("Error: Unsupported data type.");
@@ -384,6 +451,7 @@ namespace TikTok_bot
                 clientPlatforms.Remove(ws);
                 clientChatIds.Remove(ws);
                 clientUpdates.Remove(ws);
+                requestRoutes.RemoveClient(ws);
             }
         }
     }
@@ -0,0 +1,90 @@
+"""
+Benchmark of the range downloader against a local HTTP fixture server.
+
+The server throttles every connection separately, like YouTube does for
+progressive streams, so the single-connection run shows the per-connection
+limit and the multi-connection runs show how far splitting gets around it.
+
+Usage: python bench_range_download.py [size_mb] [per_connection_kbps]
+"""
+import os
+import sys
+import time
+import hashlib
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import requests
+import range_download
+
+DEFAULT_SIZE_MB = 16
+DEFAULT_RATE_KBPS = 4096  # Per connection
+CONNECTION_COUNTS = (1, 2, 4, 8)
+SEND_CHUNK = 64 * 1024
+
+def make_handler(payload: bytes, rate_bytes: int):
+    """Build a request handler serving payload with Range support and per-connection throttling"""
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            start, end = 0, len(payload) - 1
+            range_header = self.headers.get("Range")
+            if range_header and range_header.startswith("bytes="):
+                first, _, last = range_header[len("bytes="):].partition("-")
+                start = int(first)
+                end = min(int(last), end) if last else end
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Length", str(end - start + 1))
+            self.send_header("Accept-Ranges", "bytes")
+            self.end_headers()
+
+            # Throttle: each chunk takes at least SEND_CHUNK / rate_bytes seconds
+            position = start
+            while position <= end:
+                began = time.perf_counter()
+                chunk = payload[position:min(position + SEND_CHUNK, end + 1)]
+                self.wfile.write(chunk)
+                position += len(chunk)
+                delay = len(chunk) / rate_bytes - (time.perf_counter() - began)
+                if delay > 0:
+                    time.sleep(delay)
+
+    return FixtureHandler
+
+def run(size_mb: int = DEFAULT_SIZE_MB, rate_kbps: int = DEFAULT_RATE_KBPS) -> None:
+    """Start the fixture server and time downloads with different connection counts"""
+    payload = os.urandom(size_mb * 1024**2)
+    expected = hashlib.sha256(payload).hexdigest()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(payload, rate_kbps * 1024))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/video.mp4"
+    print(f"Fixture: {size_mb} MB, {rate_kbps} KB/s per connection")
+
+    session = requests.Session()
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            for connections in CONNECTION_COUNTS:
+                path = os.path.join(folder, f"bench_{connections}.mp4")
+                began = time.perf_counter()
+                range_download.download(url, path, len(payload), session=session, connections=connections)
+                elapsed = time.perf_counter() - began
+
+                with open(path, "rb") as f:
+                    ok = hashlib.sha256(f.read()).hexdigest() == expected
+                speed = size_mb / elapsed
+                print(f"{connections} connection(s): {elapsed:6.2f}s  {speed:6.2f} MB/s  {'ok' if ok else 'CORRUPTED'}")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run(*args)
@@ -1,25 +1,147 @@
 import os
 import json
 import asyncio
+import random
+import socket
+import uuid
 import websockets
 import time
-from typing import Dict, List, Any, Optional, Callable, Awaitable
+import queue
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import asynccontextmanager
+from contextvars import ContextVar, copy_context
+from typing import Dict, List, Any, Optional, Callable, Awaitable, AsyncIterator
 from enum import Enum
 from dataclasses import dataclass
 from logger_config import setup_logger, configure_logging
 
 # Configuration constants
 DEFAULT_PORT = "8098"
-DEFAULT_RECONNECT_DELAY = 7
+DEFAULT_RECONNECT_BASE_DELAY = 1  # Backoff base after the first (immediate) reconnect attempt
+DEFAULT_RECONNECT_MAX_DELAY = 30  # Backoff ceiling
+STABLE_CONNECTION_SECONDS = 30  # Connection uptime after which backoff starts over
+DEFAULT_PING_INTERVAL = 20  # Seconds between keepalive pings
+DEFAULT_PING_TIMEOUT = 120  # Seconds to wait for pong, tgbot only answers between two results (uploads can take minutes)
+DEFAULT_OUTBOX_SIZE = 50  # Max results kept while disconnected
+DEFAULT_MAX_PENDING_REQUESTS = 32  # Requests running or waiting for a worker, further messages stay unread
+ENV_MAX_PENDING_REQUESTS = "MAX_PENDING_REQUESTS"
+
+# Batch request settings
+DEFAULT_MAX_BATCH_SIZE = 10  # Max URLs (or playlist entries) processed per batch
+DEFAULT_BATCH_CONCURRENCY = 4  # URLs of a batch fetched at the same time
+ENV_MAX_BATCH_SIZE = "BATCH_MAX_URLS"
 DEFAULT_HOST_DOCKER = "tgbot"
 DEFAULT_HOST_LOCAL = "localhost"
 ENV_PORT = "PORT"
 ENV_HOST = "SERVER_HOST"
 
+# Streaming response settings
+DEFAULT_STREAM_BATCH_SIZE = 10  # Telegram media group limit
+DEFAULT_STREAM_ITEM_TIMEOUT = 60  # Max seconds between two items of a streamed result (the first one only has the job deadline)
+DEFAULT_STREAM_LINGER = 0.5  # Seconds to wait for more items before sending a partial batch
+ENV_STREAM_RESULTS = "STREAM_RESULTS"
+ENV_STREAM_ITEM_TIMEOUT = "STREAM_ITEM_TIMEOUT"
+
+# Deadline settings
+DEFAULT_JOB_DEADLINE = 600  # Seconds per URL when the linker has no budget for its content class
+DEADLINE_GRACE = 10  # Seconds the worker gets to notice the deadline and clean up before the job is abandoned
+ENV_JOB_DEADLINE = "JOB_DEADLINE"
+
+# Job journal settings
+DEFAULT_JOURNAL_PATH = "job_journal.sqlite3"
+DEFAULT_JOB_RESUME_MAX_AGE = 900  # Jobs accepted longer ago than this are not resumed after a restart
+JOURNAL_MAX_GROUP_SIZE = 500  # Max journal writes per commit
+ENV_JOURNAL_PATH = "JOB_JOURNAL"  # "off" disables the journal
+ENV_JOB_RESUME_MAX_AGE = "JOB_RESUME_MAX_AGE"
+
+# Job claims shared by linker replicas (tgbot sends every link to all replicas of a platform)
+DEFAULT_CLAIM_LEASE = 30  # Seconds a claim stays valid without renewal
+DEFAULT_CLAIM_DEDUPE_WINDOW = 120  # Seconds a finished job still counts as the same request for other replicas
+CLAIM_POLL_INTERVAL = 2  # Seconds between checks while another replica holds the claim
+CLAIM_RETENTION = 3600  # Finished or expired claims are removed after this many seconds
+CLAIM_CLAIMED = "claimed"
+CLAIM_HELD = "held"
+CLAIM_DONE = "done"
+ENV_CLAIMS_PATH = "JOB_CLAIMS"  # Path on the volume shared by the replicas, e.g. /appdownloads/job_claims.sqlite3
+ENV_CLAIM_DEDUPE_WINDOW = "JOB_CLAIM_DEDUPE_WINDOW"
+
+# Reference point for startup phase timings (communicator is imported first by the linkers)
+PROCESS_START = time.perf_counter()
+
 # Configure logging
 configure_logging()
 logger = setup_logger("communicator")
 
+# ID of the request currently being processed (set per handle_link call)
+_current_request_id: ContextVar[Optional[str]] = ContextVar("current_request_id", default=None)
+
+# Whether tgbot routes replies of the current request by its ID (plain-text requests go to the socket's last chat)
+_current_request_routable: ContextVar[bool] = ContextVar("current_request_routable", default=False)
+
+class JobCancelled(Exception):
+    """Raised in worker code when its job ran past the deadline or was cancelled"""
+
+class CancelToken:
+    """Deadline and cancel flag of one job, checked cooperatively by the worker threads"""
+    
+    def __init__(self, budget: Optional[float] = None):
+        self.budget = budget
+        self.deadline = time.monotonic() + budget if budget else None
+        self._cancelled = threading.Event()
+    
+    def cancel(self) -> None:
+        """Ask the worker to stop"""
+        self._cancelled.set()
+    
+    def cancelled(self) -> bool:
+        """Whether the job was cancelled or its deadline passed"""
+        return self._cancelled.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline)
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline (None without deadline)"""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+    
+    def check(self) -> None:
+        """Raise JobCancelled if the job should stop"""
+        if self.cancelled():
+            reason = "cancelled" if self._cancelled.is_set() else f"deadline of {self.budget:.0f}s exceeded"
+            raise JobCancelled(f"Job {reason}")
+
+# Cancel token of the job currently being processed (visible in worker threads started via run_in_executor)
+_current_cancel_token: ContextVar[Optional[CancelToken]] = ContextVar("current_cancel_token", default=None)
+
+def current_cancel_token() -> Optional[CancelToken]:
+    """Cancel token of the current job, if any"""
+    return _current_cancel_token.get()
+
+def check_cancelled() -> None:
+    """Raise JobCancelled if the current job should stop (cheap enough for progress hooks)"""
+    token = _current_cancel_token.get()
+    if token is not None:
+        token.check()
+
+async def run_in_executor(
+    executor, func: Callable[..., Any], *args, on_abandoned: Optional[Callable[[Any], None]] = None
+) -> Any:
+    """
+    loop.run_in_executor carrying the caller's context (request ID, cancel token) into the worker thread.
+    Cancelling the caller does not stop a running worker: on_abandoned then gets the worker's result
+    (None if it failed) once it returns, e.g. to remove files written after the caller cleaned up.
+    """
+    future = asyncio.get_running_loop().run_in_executor(executor, copy_context().run, func, *args)
+    if on_abandoned is None:
+        return await future
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        future.add_done_callback(
+            lambda done: on_abandoned(None if done.cancelled() or done.exception() else done.result())
+        )
+        raise
+
 class MediaType(Enum):
     """Standard media types"""
     PHOTO = "photo"
@@ -39,6 +161,551 @@ class FetchResult:
     media: List[Any]
     error: Optional[str] = None
 
+@dataclass
+class LinkRequest:
+    """Incoming request: a single URL, several URLs or a playlist"""
+    request_id: str
+    urls: List[str]
+    playlist: Optional[str] = None
+    routable: bool = False  # ID was assigned by tgbot, replies reach the right chat on any connection
+    
+    @property
+    def is_batch(self) -> bool:
+        """Whether the request needs batch processing"""
+        return len(self.urls) > 1 or self.playlist is not None
+
+async def iterate_in_executor(executor, gen_function: Callable[..., Any], *args) -> AsyncIterator[Any]:
+    """Run a blocking generator in an executor and yield its items as soon as they are produced"""
+    loop = asyncio.get_running_loop()
+    items_queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def produce() -> None:
+        try:
+            for item in gen_function(*args):
+                loop.call_soon_threadsafe(items_queue.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(items_queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(items_queue.put_nowait, done)
+
+    future = loop.run_in_executor(executor, copy_context().run, produce)
+    while True:
+        item = await items_queue.get()
+        if item is done:
+            break
+        if isinstance(item, Exception):
+            raise item
+        yield item
+    await future
+
+class StartupTimings:
+    """Seconds from process start to the end of each startup phase"""
+    
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+    
+    def mark(self, phase: str) -> float:
+        """Record the end of a startup phase (only the first mark of a phase counts)"""
+        if phase not in self.phases:
+            self.phases[phase] = time.perf_counter() - PROCESS_START
+            logger.debug(f"Startup phase '{phase}' reached after {self.phases[phase]:.3f}s")
+        return self.phases[phase]
+    
+    def summary(self) -> str:
+        """Human readable list of phases in the order they were reached"""
+        return ", ".join(f"{phase}={elapsed:.3f}s" for phase, elapsed in self.phases.items())
+
+# Shared by the linker module and its communicator
+startup_timings = StartupTimings()
+
+class Metrics:
+    """Thread-safe process-wide counters and gauges"""
+    
+    def __init__(self):
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def increment(self, name: str, value: float = 1) -> None:
+        """Add value to a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+    
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set current value of a gauge"""
+        with self._lock:
+            self.gauges[name] = value
+    
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Copy of all current values"""
+        with self._lock:
+            return {"counters": dict(self.counters), "gauges": dict(self.gauges)}
+
+# Shared by the linker modules and communicators of the process
+metrics = Metrics()
+
+# Adaptive concurrency settings
+LIMITER_BACKOFF = 0.7  # Limit multiplier on errors or a latency jump
+LIMITER_LATENCY_TOLERANCE = 2.0  # Recent latency above this multiple of the long-term average counts as congestion
+LIMITER_COOLDOWN = 5  # Min seconds between two decreases (one burst of failures is one signal)
+LIMITER_FAST_ALPHA = 0.3  # Smoothing of the recent latency average
+LIMITER_SLOW_ALPHA = 0.05  # Smoothing of the long-term latency average
+
+class LimiterSlot:
+    """Outcome of one job run under an AdaptiveLimiter (exceptions mark it failed too)"""
+    
+    def __init__(self):
+        self.failed = False
+        self.work = 1.0  # Size of the job in the caller's unit (e.g. MB downloaded), latency is compared per unit
+        self.saturated = False  # The limit was reached while the job ran
+        self.counted = True  # False leaves the limit alone (e.g. the job was refused before any real work)
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for jobs sent to an executor.
+
+    Every successful job that ran while the limit was reached raises it by
+    1/limit (about +1 per round of jobs). Failed jobs, or a recent latency
+    average well above the long-term one, cut it by LIMITER_BACKOFF. Latency
+    is tracked per job kind and divided by the job's work, so one long video
+    does not look like congestion. Jobs stopped by their deadline or by
+    cancellation are not counted. The limit stays within [floor, ceiling] and
+    is exported as the '<name>_concurrency_limit' gauge.
+    """
+    
+    def __init__(self, name: str, initial: int, floor: int, ceiling: int):
+        self.name = name
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        self.limit = float(min(max(initial, self.floor), self.ceiling))
+        self.in_flight = 0
+        self._latency: Dict[str, List[float]] = {}  # Job kind -> [recent, long-term] latency per unit of work
+        self._active: set = set()
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+        self._export()
+    
+    def _export(self) -> None:
+        """Publish current limit and load"""
+        metrics.set_gauge(f"{self.name}_concurrency_limit", int(self.limit))
+        metrics.set_gauge(f"{self.name}_in_flight", self.in_flight)
+    
+    def _observe(self, kind: str, slot: LimiterSlot, elapsed: float) -> None:
+        """Adjust the limit after a job finished"""
+        congested = False
+        if not slot.failed:
+            latency = elapsed / max(slot.work, 1e-3)
+            averages = self._latency.get(kind)
+            if averages is None:
+                averages = self._latency[kind] = [latency, latency]
+            else:
+                averages[0] += LIMITER_FAST_ALPHA * (latency - averages[0])
+                averages[1] += LIMITER_SLOW_ALPHA * (latency - averages[1])
+            congested = averages[0] > averages[1] * LIMITER_LATENCY_TOLERANCE
+        
+        previous = int(self.limit)
+        if slot.failed or congested:
+            now = time.monotonic()
+            if now - self._last_decrease < LIMITER_COOLDOWN:
+                return
+            self._last_decrease = now
+            self.limit = max(self.floor, self.limit * LIMITER_BACKOFF)
+            if int(self.limit) != previous:
+                reason = "errors" if slot.failed else f"{kind or 'job'} latency {averages[0]:.2f}s vs {averages[1]:.2f}s"
+                logger.info(f"{self.name} concurrency limit lowered to {int(self.limit)} ({reason})")
+        elif slot.saturated:
+            # Only a limit that was actually used has shown it can be raised
+            self.limit = min(self.ceiling, self.limit + 1 / self.limit)
+            if int(self.limit) != previous:
+                logger.debug(f"{self.name} concurrency limit raised to {int(self.limit)}")
+    
+    @asynccontextmanager
+    async def slot(self, kind: str = "") -> AsyncIterator[LimiterSlot]:
+        """Wait for a free slot, run the job and feed its latency and outcome back into the limit"""
+        slot = LimiterSlot()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+            self._active.add(slot)
+            if self.in_flight >= int(self.limit):
+                for active in self._active:
+                    active.saturated = True
+            self._export()
+        
+        started = time.monotonic()
+        cancelled = False
+        try:
+            yield slot
+        except (asyncio.CancelledError, JobCancelled):
+            # Shutdown or the job's own deadline, says nothing about the upstream
+            cancelled = True
+            raise
+        except Exception:
+            slot.failed = True
+            raise
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._active.discard(slot)
+                if not cancelled and slot.counted:
+                    self._observe(kind, slot, time.monotonic() - started)
+                self._export()
+                self._condition.notify_all()
+    
+    async def run_in_executor(self, executor, func: Callable[..., Any], *args) -> Any:
+        """Run a blocking function in the executor within the limit"""
+        async with self.slot():
+            return await run_in_executor(executor, func, *args)
+
+class JobJournal:
+    """
+    SQLite (WAL) journal of accepted jobs and undelivered results.
+
+    Writes are queued and applied by a background thread, which commits all
+    writes queued meanwhile in one transaction. Callers never wait for the disk.
+    """
+    
+    def __init__(self, path: str, platform_name: str):
+        self.path = path
+        self.platform_name = platform_name
+        self._queue: queue.Queue = queue.Queue()
+        self._connect().close()  # Create schema before the first write or read
+        self._thread = threading.Thread(target=self._writer, name=f"journal-{platform_name}", daemon=True)
+        self._thread.start()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database in WAL mode and create tables if needed"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # WAL keeps committed data across process crashes
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "platform TEXT, request_id TEXT, request TEXT, state TEXT, accepted REAL, updated REAL, "
+            "PRIMARY KEY (platform, request_id))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, platform TEXT, request_id TEXT, payload TEXT, created REAL)"
+        )
+        conn.commit()
+        return conn
+    
+    def _writer(self) -> None:
+        """Apply queued writes, one commit per group"""
+        conn = self._connect()
+        while True:
+            group = [self._queue.get()]
+            while len(group) < JOURNAL_MAX_GROUP_SIZE:
+                try:
+                    group.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    for sql, params in group:
+                        conn.execute(sql, params)
+            except sqlite3.Error as e:
+                logger.error(f"Job journal write failed ({len(group)} writes lost): {e}")
+    
+    def _write(self, sql: str, *params) -> None:
+        """Queue a write for the next group commit"""
+        self._queue.put((sql, params))
+    
+    def accept(self, request: LinkRequest) -> None:
+        """Record a newly received job"""
+        now = time.time()
+        data = json.dumps({"id": request.request_id, "urls": request.urls, "playlist": request.playlist})
+        self._write(
+            "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, 'accepted', ?, ?)",
+            self.platform_name, request.request_id, data, now, now
+        )
+    
+    def set_state(self, request_id: str, state: str) -> None:
+        """Record a state transition of a job"""
+        self._write(
+            "UPDATE jobs SET state = ?, updated = ? WHERE platform = ? AND request_id = ?",
+            state, time.time(), self.platform_name, request_id
+        )
+    
+    def finish(self, request_id: str) -> None:
+        """Forget a job whose results were all sent or buffered"""
+        self._write("DELETE FROM jobs WHERE platform = ? AND request_id = ?", self.platform_name, request_id)
+    
+    def buffer_result(self, key: str, response: Dict[str, Any]) -> None:
+        """Keep an undelivered response"""
+        self._write(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+            key, self.platform_name, response.get("request_id"), json.dumps(response), time.time()
+        )
+    
+    def result_delivered(self, key: str) -> None:
+        """Forget a buffered response once it was sent (or dropped)"""
+        self._write("DELETE FROM results WHERE key = ?", key)
+    
+    def load_pending(self, max_age: float) -> tuple[List[str], List[tuple[str, Dict[str, Any]]]]:
+        """
+        Return unfinished jobs (as request messages) and undelivered responses
+        left by a previous run. Jobs older than max_age are dropped.
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                expired = conn.execute(
+                    "DELETE FROM jobs WHERE platform = ? AND accepted < ?",
+                    (self.platform_name, time.time() - max_age)
+                ).rowcount
+            if expired:
+                logger.warning(f"Dropped {expired} journaled jobs older than {max_age}s")
+            jobs = [row[0] for row in conn.execute(
+                "SELECT request FROM jobs WHERE platform = ? ORDER BY accepted", (self.platform_name,)
+            )]
+            results = [(key, json.loads(payload)) for key, payload in conn.execute(
+                "SELECT key, payload FROM results WHERE platform = ? ORDER BY created", (self.platform_name,)
+            )]
+            return jobs, results
+        finally:
+            conn.close()
+
+class JobClaims:
+    """
+    Leases on jobs, shared by linker replicas through an SQLite file on a common volume.
+
+    The replica that claims a job first processes it and renews its lease while
+    working. Other replicas wait: when the job is finished they drop it, when
+    the lease runs out (the holder died) one of them takes the job over.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        platform_name: str,
+        lease_seconds: float = DEFAULT_CLAIM_LEASE,
+        dedupe_window: float = DEFAULT_CLAIM_DEDUPE_WINDOW
+    ):
+        self.path = path
+        self.platform_name = platform_name
+        self.lease_seconds = lease_seconds
+        self.dedupe_window = dedupe_window
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._local = threading.local()
+        self._connection().close()
+        self._local.conn = None
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection (claims are checked from executor threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS claims ("
+                "key TEXT PRIMARY KEY, owner TEXT, claimed REAL, expires REAL, done REAL)"
+            )
+            self._local.conn = conn
+        return conn
+    
+    def claim(self, key: str, unique: bool = False) -> str:
+        """
+        Try to take the job: returns CLAIM_CLAIMED, CLAIM_HELD (by a live replica) or CLAIM_DONE.
+        A finished job with a unique key (tgbot request ID) stays done until its claim is removed,
+        one keyed by its links only for the dedupe window (the same link may be sent again).
+        """
+        key = f"{self.platform_name}:{key}"
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT owner, expires, done FROM claims WHERE key = ?", (key,)).fetchone()
+            if row:
+                owner, expires, done = row
+                # This replica never receives the same message twice, so its own claims don't block it
+                if owner != self.owner:
+                    if done is not None and (unique or now - done < self.dedupe_window):
+                        return CLAIM_DONE
+                    if done is None and expires > now:
+                        return CLAIM_HELD
+            
+            conn.execute(
+                "INSERT OR REPLACE INTO claims VALUES (?, ?, ?, ?, NULL)",
+                (key, self.owner, now, now + self.lease_seconds)
+            )
+            conn.execute("DELETE FROM claims WHERE COALESCE(done, expires) < ?", (now - CLAIM_RETENTION,))
+            return CLAIM_CLAIMED
+        finally:
+            conn.execute("COMMIT")
+    
+    def renew(self, keys: List[str]) -> None:
+        """Extend the leases of jobs still being processed"""
+        conn = self._connection()
+        expires = time.time() + self.lease_seconds
+        conn.executemany(
+            "UPDATE claims SET expires = ? WHERE key = ? AND owner = ?",
+            [(expires, f"{self.platform_name}:{key}", self.owner) for key in keys]
+        )
+    
+    def release(self, key: str, finished: bool = True) -> None:
+        """Mark the job finished so other replicas drop it, or give it up so one of them takes it over"""
+        column = "done" if finished else "expires"
+        self._connection().execute(
+            f"UPDATE claims SET {column} = ? WHERE key = ? AND owner = ?",
+            (time.time(), f"{self.platform_name}:{key}", self.owner)
+        )
+
+def _env_flag(name: str) -> bool:
+    """Read a boolean flag from environment"""
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+# Hedged request settings
+DEFAULT_HEDGE_BUDGET = 0.1  # Max share of calls that may start a second attempt
+DEFAULT_HEDGE_WORKERS = 8  # Threads running attempts (slow losers keep theirs until they return)
+HEDGE_MIN_SAMPLES = 20  # Latencies needed before the p95 is trusted
+HEDGE_HISTORY = 200  # Recent latencies the p95 is computed from
+HEDGE_MIN_DELAY = 0.5  # Never start a second attempt sooner than this (seconds)
+HEDGE_BUDGET_WINDOW = 1000  # Calls after which the budget counters are halved (budget follows recent load)
+ENV_HEDGE_METADATA = "HEDGE_METADATA"
+ENV_HEDGE_BUDGET = "HEDGE_BUDGET"
+
+class Hedger:
+    """
+    Hedged execution of idempotent, metadata-only calls from worker threads.
+
+    An attempt that takes longer than the running p95 latency gets a second
+    attempt in parallel (a backup function may use another session). The first
+    successful result wins and the other one's result is discarded. At most
+    budget * calls attempts are hedged. Attempts never queue for the pool: a
+    call that could not be hedged (no p95 yet, budget spent, no idle thread)
+    runs on the caller's thread, and hedges only start on an idle thread.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        enabled: Optional[bool] = None,
+        budget: Optional[float] = None,
+        workers: int = DEFAULT_HEDGE_WORKERS
+    ):
+        self.name = name
+        self.enabled = _env_flag(ENV_HEDGE_METADATA) if enabled is None else enabled
+        self.budget = budget if budget is not None else float(os.getenv(ENV_HEDGE_BUDGET, DEFAULT_HEDGE_BUDGET))
+        self.workers = workers
+        self.latencies: deque = deque(maxlen=HEDGE_HISTORY)
+        self.calls = 0
+        self.hedges = 0
+        self._busy = 0  # Pool threads reserved by running attempts (hung losers included)
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+    
+    def hedge_delay(self) -> Optional[float]:
+        """Running p95 latency, None until there are enough samples"""
+        with self._lock:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return max(HEDGE_MIN_DELAY, ordered[int(len(ordered) * 0.95) - 1])
+    
+    def _count_call(self) -> None:
+        """Count a call for the budget"""
+        with self._lock:
+            self.calls += 1
+            if self.calls >= HEDGE_BUDGET_WINDOW:
+                self.calls //= 2
+                self.hedges //= 2
+    
+    def _has_budget(self) -> bool:
+        """Whether the budget allows one more hedge"""
+        with self._lock:
+            return self.hedges + 1 <= self.budget * self.calls
+    
+    def _take_budget(self) -> bool:
+        """Reserve one hedge if the budget allows it"""
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.calls:
+                return False
+            self.hedges += 1
+            return True
+    
+    def _reserve_thread(self) -> bool:
+        """Reserve an idle pool thread, False when all of them are busy"""
+        with self._lock:
+            if self._busy >= self.workers:
+                return False
+            self._busy += 1
+            return True
+    
+    def _run_inline(self, func: Callable[[], Any]) -> Any:
+        """Run an attempt on the caller's thread, recording its latency when it succeeds"""
+        started = time.monotonic()
+        result = func()
+        with self._lock:
+            self.latencies.append(time.monotonic() - started)
+        return result
+    
+    def _submit(self, func: Callable[[], Any]):
+        """Start an attempt on a reserved pool thread, recording its latency when it succeeds"""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"hedge-{self.name}")
+        
+        started = time.monotonic()
+        future = self._pool.submit(copy_context().run, func)
+        
+        def record(done_future) -> None:
+            with self._lock:
+                self._busy -= 1
+                if not done_future.cancelled() and done_future.exception() is None:
+                    self.latencies.append(time.monotonic() - started)
+        
+        future.add_done_callback(record)
+        return future
+    
+    def call(
+        self,
+        primary: Callable[[], Any],
+        backup: Optional[Callable[[], Any]] = None,
+        inline: Optional[Callable[[], Any]] = None
+    ) -> Any:
+        """
+        Run primary, hedging it with backup (or primary again) once it is slower than p95.
+        inline replaces primary when the call stays on the caller's thread, e.g. to use
+        resources the caller holds that must not be used from pool threads.
+        """
+        if not self.enabled:
+            return (inline or primary)()
+        
+        self._count_call()
+        delay = self.hedge_delay()
+        if delay is None or not self._has_budget() or not self._reserve_thread():
+            # Cannot be hedged, so nothing is gained by leaving the caller's thread
+            return self._run_inline(inline or primary)
+        
+        first = self._submit(primary)
+        attempts = [first]
+        wait(attempts, timeout=delay)
+        if not first.done() and self._reserve_thread():
+            if self._take_budget():
+                logger.info(f"{self.name} call slower than p95 ({delay:.1f}s), starting hedged attempt")
+                metrics.increment(f"{self.name}_hedges")
+                attempts.append(self._submit(backup or primary))
+            else:
+                with self._lock:
+                    self._busy -= 1
+        
+        pending = set(attempts)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is not first:
+                        metrics.increment(f"{self.name}_hedge_wins")
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
 class WebSocketCommunicator:
     """WebSocket communication handler for media downloaders"""
     
@@ -48,47 +715,170 @@ class WebSocketCommunicator:
         fetch_function: Callable[[str], Awaitable[FetchResult]],
         port: Optional[str] = None,
         host: Optional[str] = None,
-        reconnect_delay: int = DEFAULT_RECONNECT_DELAY,
-        log_level: Optional[int] = None
+        reconnect_base_delay: float = DEFAULT_RECONNECT_BASE_DELAY,
+        reconnect_max_delay: float = DEFAULT_RECONNECT_MAX_DELAY,
+        ping_interval: Optional[float] = DEFAULT_PING_INTERVAL,
+        ping_timeout: Optional[float] = DEFAULT_PING_TIMEOUT,
+        outbox_size: int = DEFAULT_OUTBOX_SIZE,
+        log_level: Optional[int] = None,
+        stream_function: Optional[Callable[[str], AsyncIterator[Any]]] = None,
+        stream_results: Optional[bool] = None,
+        stream_batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+        stream_item_timeout: Optional[float] = None,
+        stream_linger: float = DEFAULT_STREAM_LINGER,
+        warmup_function: Optional[Callable[[], Awaitable[None]]] = None,
+        playlist_function: Optional[Callable[[str, int], Awaitable[List[str]]]] = None,
+        max_batch_size: Optional[int] = None,
+        batch_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        journal_path: Optional[str] = None,
+        job_resume_max_age: Optional[float] = None,
+        claims_path: Optional[str] = None,
+        deadline_function: Optional[Callable[[str], Optional[float]]] = None,
+        max_pending_requests: Optional[int] = None
     ):
         """Initialize communicator with platform and fetch function"""
         self.platform_name = platform_name
         self.fetch_function = fetch_function
-        self.reconnect_delay = reconnect_delay
+        self.reconnect_base_delay = reconnect_base_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self._reconnect_attempt = 0
+        self._connected_at: Optional[float] = None
+        
+        # Results that could not be delivered, flushed once the connection is back
+        self.outbox: deque = deque(maxlen=outbox_size)
+        
+        # Streaming mode (opt-in): send items as they are resolved instead of one final message
+        self.stream_function = stream_function
+        self.stream_results = _env_flag(ENV_STREAM_RESULTS) if stream_results is None else stream_results
+        self.stream_batch_size = stream_batch_size
+        self.stream_item_timeout = stream_item_timeout or float(
+            os.getenv(ENV_STREAM_ITEM_TIMEOUT, DEFAULT_STREAM_ITEM_TIMEOUT)
+        )
+        self.stream_linger = stream_linger
         
         # Connection settings
         self.port = port or os.getenv(ENV_PORT, DEFAULT_PORT)
         default_host = DEFAULT_HOST_DOCKER if os.path.exists('/.dockerenv') else DEFAULT_HOST_LOCAL
         self.host = host or os.getenv(ENV_HOST, default_host)
         
+        # Heavy initialization (imports, sessions) started in background after registration
+        self.warmup_function = warmup_function
+        
+        # Batch requests: several URLs (or playlist entries) fetched concurrently, answered in one message
+        self.playlist_function = playlist_function
+        self.max_batch_size = max_batch_size or int(os.getenv(ENV_MAX_BATCH_SIZE, DEFAULT_MAX_BATCH_SIZE))
+        self.batch_concurrency = batch_concurrency
+        self.warmup_task: Optional[asyncio.Task] = None
+        self.startup_timings = startup_timings
+        
+        # Durable job journal: unfinished jobs with a tgbot ID are resumed and their undelivered results resent after a restart
+        journal_path = journal_path or os.getenv(ENV_JOURNAL_PATH, DEFAULT_JOURNAL_PATH)
+        self.journal: Optional[JobJournal] = None
+        if journal_path.lower() != "off":
+            self.journal = JobJournal(journal_path, platform_name)
+        self.job_resume_max_age = job_resume_max_age or float(
+            os.getenv(ENV_JOB_RESUME_MAX_AGE, DEFAULT_JOB_RESUME_MAX_AGE)
+        )
+        self.resumed_jobs: List[LinkRequest] = []
+        self.resume_task: Optional[asyncio.Task] = None
+        
+        # Claims let several replicas share the links tgbot sends to all of them
+        claims_path = claims_path or os.getenv(ENV_CLAIMS_PATH)
+        self.claims: Optional[JobClaims] = None
+        if claims_path:
+            self.claims = JobClaims(
+                claims_path,
+                platform_name,
+                dedupe_window=float(os.getenv(ENV_CLAIM_DEDUPE_WINDOW, DEFAULT_CLAIM_DEDUPE_WINDOW))
+            )
+        # Time budget per URL (seconds), from the linker's content classes or JOB_DEADLINE
+        self.deadline_function = deadline_function
+        self.default_deadline = float(os.getenv(ENV_JOB_DEADLINE, DEFAULT_JOB_DEADLINE))
+        
+        # Requests run as tasks side by side, the linker's limiter bounds the work they hand to its workers
+        self._pending_requests = asyncio.Semaphore(
+            max_pending_requests or int(os.getenv(ENV_MAX_PENDING_REQUESTS, DEFAULT_MAX_PENDING_REQUESTS))
+        )
+        
+        self._held_claims: set = set()
+        self._background_tasks: set = set()
+        self.claim_renewal_task: Optional[asyncio.Task] = None
+        
         # Setup logger and connection
         self.logger = setup_logger(f"communicator.{platform_name}", log_level)
         self.current_websocket: Optional[websockets.WebSocketClientProtocol] = None
         
         self.logger.info(f"Using port: {self.port}, host: {self.host}")
+        if self.stream_results and self.stream_function:
+            self.logger.info("Streaming response mode enabled")
+        if self.claims:
+            self.logger.info(f"Sharing jobs with other replicas as {self.claims.owner}")
     
     @property
     def websocket_url(self) -> str:
         """Full WebSocket URL"""
         return f"ws://{self.host}:{self.port}"
     
+    def _buffer_response(self, response: Dict[str, Any], key: Optional[str] = None) -> None:
+        """Keep undelivered response in the outbox (oldest one is dropped when full)"""
+        if key is None and not _current_request_routable.get():
+            # tgbot would deliver it to whoever sent the last link on the new connection
+            self.logger.warning(f"No active connection, result {response.get('request_id')} dropped (request has no tgbot ID)")
+            return
+        
+        if len(self.outbox) == self.outbox.maxlen:
+            dropped_key, dropped = self.outbox[0]
+            self.logger.warning(f"Outbox full, dropping result {dropped.get('request_id')}")
+            if self.journal:
+                self.journal.result_delivered(dropped_key)
+        
+        if key is None:
+            key = uuid.uuid4().hex
+            if self.journal:
+                self.journal.buffer_result(key, response)
+        self.outbox.append((key, response))
+        self.logger.warning(
+            f"No active connection, result {response.get('request_id')} buffered ({len(self.outbox)} in outbox)"
+        )
+    
+    async def _flush_outbox(self, websocket) -> None:
+        """Send buffered results over a fresh connection"""
+        if not self.outbox:
+            return
+        
+        self.logger.info(f"Flushing {len(self.outbox)} buffered results")
+        while self.outbox:
+            key, response = self.outbox[0]
+            # Leave the response in the outbox if the connection drops again
+            await websocket.send(json.dumps(response))
+            self.outbox.popleft()
+            if self.journal:
+                self.journal.result_delivered(key)
+            self.logger.info(f"Delivered buffered result {response.get('request_id')}")
+    
     async def send_media_response(self, response: Dict[str, Any]) -> None:
-        """Send formatted response to client"""
+        """Send formatted response to client, buffering it if the connection is down"""
+        request_id = _current_request_id.get()
+        if request_id and "request_id" not in response:
+            response = {**response, "request_id": request_id}
+        
         if not self.current_websocket:
-            self.logger.error("No active websocket connection")
+            self._buffer_response(response)
             return
         
         try:
             await self.current_websocket.send(json.dumps(response))
+        except websockets.exceptions.ConnectionClosed as e:
+            self.logger.warning(f"Connection lost while sending response: {e}")
+            self.current_websocket = None
+            self._buffer_response(response)
         except Exception as e:
             self.logger.error(f"Error sending response: {e}")
     
     async def send_error(self, message: str, details: Optional[str] = None) -> None:
         """Send error message to client"""
-        if not self.current_websocket:
-            self.logger.error(f"Error (not sent): {message}")
-            return
-            
         error_msg = {"error": message}
         if details:
             error_msg["details"] = details
@@ -149,44 +939,459 @@ class WebSocketCommunicator:
         self.logger.info(f"Sending {len(media_items)} media items")
         await self.send_media_response(response)
     
-    async def handle_link(self, websocket, url: str) -> None:
-        """Process URL and send results"""
+    async def send_streamed_result(self, items: AsyncIterator[Any]) -> None:
+        """
+        Send items of a multi-item result as soon as they are ready.
+
+        Text items are sent right away, media items are grouped into batches of
+        up to stream_batch_size. A partial batch is sent once no new item arrives
+        within stream_linger seconds. The result is closed with {"done": true}.
+        The first item may take a whole download, so only the job deadline
+        bounds it; later items must follow within stream_item_timeout.
+        """
+        items_queue: asyncio.Queue = asyncio.Queue()
+        end_marker = object()
+
+        async def pump() -> None:
+            try:
+                async for item in items:
+                    await items_queue.put(item)
+            except Exception as e:
+                await items_queue.put(e)
+            finally:
+                await items_queue.put(end_marker)
+
+        pump_task = asyncio.create_task(pump())
+        token = _current_cancel_token.get()
+        batch: List[Dict[str, Any]] = []
+        received = 0
+        sent_count = 0
+        failed = False
+
+        async def flush() -> None:
+            nonlocal sent_count
+            if not batch:
+                return
+            self.logger.info(f"Streaming {len(batch)} media items")
+            await self.send_media_response({"media": list(batch)})
+            sent_count += len(batch)
+            batch.clear()
+
+        try:
+            while True:
+                if batch:
+                    timeout = self.stream_linger
+                else:
+                    timeout = self.stream_item_timeout if received else None
+                if token and token.deadline is not None:
+                    # The worker stops itself at the deadline, the grace only abandons a stuck one
+                    left = token.remaining() + DEADLINE_GRACE
+                    timeout = left if timeout is None else min(timeout, left)
+                try:
+                    item = await asyncio.wait_for(items_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    expired = token is not None and token.cancelled()
+                    if batch and not expired:
+                        await flush()
+                        continue
+                    await flush()
+                    if expired:
+                        self.logger.warning(f"Streamed result did not finish within {token.budget:.0f}s")
+                        metrics.increment(f"{self.platform_name}_deadline_exceeded")
+                        await self.send_error("Request timed out")
+                    else:
+                        self.logger.warning(f"No media item received within {self.stream_item_timeout}s")
+                        await self.send_error("Timed out waiting for media")
+                    failed = True
+                    break
+                
+                if item is end_marker:
+                    break
+                received += 1
+                if isinstance(item, Exception):
+                    await flush()
+                    self.logger.error(f"Error while streaming result: {item}")
+                    await self.send_error("Error processing request", str(item))
+                    failed = True
+                    break
+                
+                formatted_item = self._prepare_media_item(item)
+                if not formatted_item:
+                    continue
+                if formatted_item["type"] == "text":
+                    await self.send_media_response({"media": [formatted_item]})
+                    sent_count += 1
+                    continue
+                
+                batch.append(formatted_item)
+                if len(batch) >= self.stream_batch_size:
+                    await flush()
+            
+            await flush()
+        finally:
+            pump_task.cancel()
+        
+        if not sent_count and not failed:
+            await self.send_error("No valid media found")
+        
+        await self.send_media_response({"done": True, "count": sent_count})
+    
+    @staticmethod
+    def _parse_request(message: str) -> LinkRequest:
+        """
+        Parse incoming message into a LinkRequest.
+
+        Plain text messages carry one or more whitespace separated URLs and get
+        a generated ID. JSON messages may pass their own ID and a URL, a list of
+        URLs or a playlist: {"id": "...", "url": "..." | "urls": [...] | "playlist": "..."}.
+        Only requests with an ID from the sender are routable.
+        """
+        message = message.strip()
+        if message.startswith("{"):
+            try:
+                data = json.loads(message)
+                urls = data.get("urls") or ([data["url"]] if data.get("url") else [])
+                if not isinstance(urls, list):
+                    urls = [urls]  # A lone string is one URL, not a sequence of characters
+                return LinkRequest(
+                    request_id=str(data.get("id") or uuid.uuid4().hex[:8]),
+                    urls=[str(url).strip() for url in urls],
+                    playlist=data.get("playlist"),
+                    routable=bool(data.get("id"))
+                )
+            except (ValueError, AttributeError, TypeError):
+                pass
+        return LinkRequest(request_id=uuid.uuid4().hex[:8], urls=message.split() or [""])
+    
+    def _new_cancel_token(self, url: str) -> CancelToken:
+        """Cancel token with the time budget of the URL's content class"""
+        budget = self.deadline_function(url) if self.deadline_function else None
+        return CancelToken(budget or self.default_deadline)
+    
+    async def fetch_with_deadline(self, url: str) -> FetchResult:
+        """Run fetch_function within the URL's time budget, the worker is told to stop once it runs out"""
+        token = self._new_cancel_token(url)
+        _current_cancel_token.set(token)
         try:
-            self.current_websocket = websocket
-            self.logger.info(f"Processing URL: {url}")
-            result = await self.fetch_function(url)
+            # The worker normally notices the deadline itself, wait_for only abandons a stuck one
+            result = await asyncio.wait_for(self.fetch_function(url), token.budget + DEADLINE_GRACE)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Abandoned {url}, worker did not stop within {DEADLINE_GRACE}s after the deadline")
+            result = FetchResult(media=[], error="Request timed out")
+        finally:
+            expired = token.cancelled()
+            token.cancel()
+        
+        if expired and result.error:
+            metrics.increment(f"{self.platform_name}_deadline_exceeded")
+        return result
+    
+    async def handle_link(self, url: str, request_id: Optional[str] = None) -> None:
+        """Process URL and send results over the current connection (set only by connect_websocket)"""
+        _current_request_id.set(request_id)
+        try:
+            self.logger.info(f"Processing URL: {url} (request {request_id})")
+            if self.stream_results and self.stream_function:
+                token = self._new_cancel_token(url)
+                _current_cancel_token.set(token)
+                try:
+                    await self.send_streamed_result(self.stream_function(url))
+                finally:
+                    token.cancel()
+                return
+            result = await self.fetch_with_deadline(url)
             await self.send_result(result)
         except Exception as e:
             self.logger.exception(f"Error processing URL: {url}")
             await self.send_error("Error processing request", str(e))
     
+    async def send_batch_result(self, urls: List[str], results: List[FetchResult]) -> None:
+        """Send media of all batch results in URL order, listing URLs that failed"""
+        media_items = []
+        errors = []
+        for url, result in zip(urls, results):
+            if result.error:
+                errors.append({"url": url, "error": result.error})
+                continue
+            
+            items = [formatted for item in result.media if (formatted := self._prepare_media_item(item))]
+            if not items:
+                errors.append({"url": url, "error": "No valid media found"})
+            media_items.extend(items)
+        
+        if not media_items:
+            await self.send_error("No valid media found", "; ".join(f"{e['url']}: {e['error']}" for e in errors))
+            return
+        
+        response: Dict[str, Any] = {"media": media_items}
+        if errors:
+            response["errors"] = errors
+        self.logger.info(f"Sending {len(media_items)} media items for {len(urls)} URLs ({len(errors)} failed)")
+        await self.send_media_response(response)
+    
+    async def handle_batch(self, request: LinkRequest) -> None:
+        """Fetch URLs of a batch (or playlist) concurrently and send aggregated results"""
+        _current_request_id.set(request.request_id)
+        try:
+            urls = list(request.urls)
+            if request.playlist:
+                if not self.playlist_function:
+                    await self.send_error("Playlists are not supported")
+                    return
+                self.logger.info(f"Expanding playlist: {request.playlist} (request {request.request_id})")
+                urls.extend(await self.playlist_function(request.playlist, self.max_batch_size))
+            
+            # Drop duplicates keeping order, then apply the cap
+            urls = list(dict.fromkeys(urls))
+            if len(urls) > self.max_batch_size:
+                self.logger.warning(f"Batch of {len(urls)} URLs truncated to {self.max_batch_size}")
+                urls = urls[:self.max_batch_size]
+            if not urls:
+                await self.send_error("No URLs to process")
+                return
+            
+            self.logger.info(f"Processing batch of {len(urls)} URLs (request {request.request_id})")
+            semaphore = asyncio.Semaphore(self.batch_concurrency)
+            
+            async def fetch_one(url: str) -> FetchResult:
+                async with semaphore:
+                    try:
+                        return await self.fetch_with_deadline(url)
+                    except Exception as e:
+                        self.logger.exception(f"Error processing URL: {url}")
+                        return FetchResult(media=[], error=str(e))
+            
+            results = await asyncio.gather(*(fetch_one(url) for url in urls))
+            await self.send_batch_result(urls, results)
+        except Exception as e:
+            self.logger.exception(f"Error processing batch request {request.request_id}")
+            await self.send_error("Error processing request", str(e))
+    
     async def connect_websocket(self) -> None:
         """Connect to WebSocket server and handle messages"""
         self.logger.info(f"Connecting to {self.websocket_url}")
         
-        async with websockets.connect(self.websocket_url) as websocket:
-            self.current_websocket = websocket
-            await websocket.send(f"platform:{self.platform_name}")
+        async with websockets.connect(
+            self.websocket_url,
+            ping_interval=self.ping_interval,
+            ping_timeout=self.ping_timeout
+        ) as websocket:
+            # "ids": tgbot sends {"id", "url"} and routes replies by request_id instead of the socket's last chat
+            await websocket.send(f"platform:{self.platform_name}:ids")
             self.logger.info(f"Connected as {self.platform_name} platform")
+            self._connected_at = time.monotonic()
+            self._on_registered()
+            
+            await self._flush_outbox(websocket)
+            self.current_websocket = websocket
+            if self.resumed_jobs and not self.resume_task:
+                self.resume_task = asyncio.create_task(self._resume_jobs())
 
             # Message handling loop
             while True:
-                url = (await websocket.recv()).strip()
-                self.logger.info(f"Received link: {url}")
-                await self.handle_link(websocket, url)
+                request = self._parse_request(await websocket.recv())
+                if self.journal and request.routable:
+                    # Only requests with a tgbot ID can be answered after a restart, on a new connection
+                    self.journal.accept(request)
+                await self._start_request(request)
+    
+    @staticmethod
+    def _claim_key(request: LinkRequest) -> str:
+        """Identify a request the same way on every replica: by its tgbot ID, else by its links"""
+        if request.routable:
+            return request.request_id
+        if not request.is_batch:
+            return request.urls[0] if request.urls else ""
+        return json.dumps({"urls": request.urls, "playlist": request.playlist})
+    
+    async def _claim(self, request: LinkRequest) -> str:
+        """Try to claim the request without blocking the event loop"""
+        key = self._claim_key(request)
+        try:
+            status = await asyncio.get_running_loop().run_in_executor(None, self.claims.claim, key, request.routable)
+        except sqlite3.Error as e:
+            # Rather answer twice than not at all
+            self.logger.error(f"Job claim failed, processing anyway: {e}")
+            return CLAIM_CLAIMED
+        if status == CLAIM_CLAIMED:
+            self._held_claims.add(key)
+        return status
+    
+    async def _release_claim(self, request: LinkRequest, finished: bool) -> None:
+        """Mark a request finished (or abandoned) for other replicas"""
+        key = self._claim_key(request)
+        self._held_claims.discard(key)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.claims.release, key, finished)
+        except sqlite3.Error as e:
+            self.logger.error(f"Job claim release failed: {e}")
+    
+    async def _renew_claims(self) -> None:
+        """Keep leases of running jobs alive"""
+        while True:
+            await asyncio.sleep(self.claims.lease_seconds / 3)
+            if not self._held_claims:
+                continue
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.claims.renew, list(self._held_claims))
+            except sqlite3.Error as e:
+                self.logger.error(f"Job claim renewal failed: {e}")
+    
+    def _start_task(self, coroutine) -> asyncio.Task:
+        """Run a coroutine in background, keeping a reference until it is done"""
+        task = asyncio.create_task(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+    
+    async def _start_request(self, request: LinkRequest) -> None:
+        """Dispatch the request in background, waiting first while too many requests are pending"""
+        await self._pending_requests.acquire()
+        
+        async def run() -> None:
+            try:
+                await self.dispatch_request(request)
+            except Exception:
+                self.logger.exception(f"Request {request.request_id} failed")
+            finally:
+                self._pending_requests.release()
+        
+        self._start_task(run())
+    
+    async def dispatch_request(self, request: LinkRequest) -> None:
+        """Process the request unless another replica already handles it"""
+        if self.claims:
+            status = await self._claim(request)
+            if status == CLAIM_HELD and not request.routable:
+                # A takeover would answer the last chat of this replica's connection, not the sender
+                self.logger.info(f"Request {request.request_id} is handled by another replica")
+                return
+            if status == CLAIM_HELD:
+                self.logger.info(f"Request {request.request_id} is handled by another replica, following its lease")
+                if self.journal:
+                    self.journal.set_state(request.request_id, "following")
+                # Following costs no worker, so it does not count towards the pending requests
+                self._start_task(self._follow_claim(request))
+                return
+            if status == CLAIM_DONE:
+                self.logger.info(f"Request {request.request_id} was already answered by another replica")
+                if self.journal:
+                    self.journal.finish(request.request_id)
+                return
+        
+        await self.process_request(request)
+    
+    async def _follow_claim(self, request: LinkRequest) -> None:
+        """Wait until the replica holding the request finishes it, or take it over when its lease expires"""
+        while True:
+            await asyncio.sleep(CLAIM_POLL_INTERVAL)
+            status = await self._claim(request)
+            if status == CLAIM_CLAIMED:
+                self.logger.warning(f"Lease of request {request.request_id} expired, taking it over")
+                await self.process_request(request)
+                return
+            if status == CLAIM_DONE:
+                self.logger.info(f"Request {request.request_id} was answered by another replica")
+                if self.journal:
+                    self.journal.finish(request.request_id)
+                return
+    
+    async def process_request(self, request: LinkRequest) -> None:
+        """Run a single or batch request, recording its progress in the journal"""
+        if self.journal:
+            self.journal.set_state(request.request_id, "running")
+        _current_request_routable.set(request.routable)
+        
+        finished = False
+        try:
+            if request.is_batch:
+                self.logger.info(f"Received batch of {len(request.urls)} links (request {request.request_id})")
+                await self.handle_batch(request)
+            else:
+                url = request.urls[0] if request.urls else ""
+                self.logger.info(f"Received link: {url} (request {request.request_id})")
+                await self.handle_link(url, request.request_id)
+            finished = True
+        finally:
+            if self.claims:
+                # A cancelled job (shutdown) is left to the other replicas
+                await self._release_claim(request, finished)
+        
+        # Results are sent or buffered (and journaled) by now
+        if self.journal:
+            self.journal.finish(request.request_id)
+    
+    def _load_journal(self) -> None:
+        """Restore undelivered results and unfinished jobs of the previous run"""
+        jobs, results = self.journal.load_pending(self.job_resume_max_age)
+        for key, response in results:
+            self._buffer_response(response, key)
+        # Journaled jobs carry their tgbot ID, so their replies still reach the right chat
+        self.resumed_jobs = [request for request in map(self._parse_request, jobs) if request.routable]
+        if jobs or results:
+            self.logger.info(f"Journal: resuming {len(jobs)} unfinished jobs, {len(results)} undelivered results")
+    
+    async def _resume_jobs(self) -> None:
+        """Process jobs left unfinished by the previous run"""
+        while self.resumed_jobs:
+            request = self.resumed_jobs.pop(0)
+            self.logger.info(f"Resuming request {request.request_id}")
+            await self._start_request(request)
+    
+    def _on_registered(self) -> None:
+        """Record registration time and start warm-up once per communicator"""
+        phase = f"{self.platform_name}_registered"
+        if phase in self.startup_timings.phases:
+            return
+        
+        elapsed = self.startup_timings.mark(phase)
+        self.logger.info(f"Registered after {elapsed:.3f}s")
+        if self.warmup_function and not self.warmup_task:
+            self.warmup_task = asyncio.create_task(self._run_warmup())
+    
+    async def _run_warmup(self) -> None:
+        """Run warm-up in background, it must never take the connection down"""
+        try:
+            await self.warmup_function()
+            self.startup_timings.mark(f"{self.platform_name}_warmup")
+        except Exception:
+            self.logger.exception("Warm-up failed, continuing with lazy initialization")
+        self.logger.info(f"Startup timings: {self.startup_timings.summary()}")
+    
+    def _next_reconnect_delay(self) -> float:
+        """Immediate first reconnect, then jittered exponential backoff"""
+        # Start over only if the last connection was stable, not dropped right after registration
+        if self._connected_at and time.monotonic() - self._connected_at >= STABLE_CONNECTION_SECONDS:
+            self._reconnect_attempt = 0
+        self._connected_at = None
+        
+        attempt = self._reconnect_attempt
+        self._reconnect_attempt += 1
+        if attempt == 0:
+            return 0
+        
+        ceiling = min(self.reconnect_max_delay, self.reconnect_base_delay * (2 ** (attempt - 1)))
+        return random.uniform(ceiling / 2, ceiling)
     
     async def run(self) -> None:
         """Main connection loop with reconnect logic"""
+        if self.journal:
+            self._load_journal()
+        if self.claims and not self.claim_renewal_task:
+            self.claim_renewal_task = asyncio.create_task(self._renew_claims())
+        
         while True:
             try:
                 await self.connect_websocket()
-            except (websockets.exceptions.ConnectionClosed, OSError):
-                self.logger.warning(f"Disconnected. Reconnecting in {self.reconnect_delay}s")
+            except (websockets.exceptions.ConnectionClosed, OSError, asyncio.TimeoutError):
                 self.current_websocket = None
-                await asyncio.sleep(self.reconnect_delay)
+                delay = self._next_reconnect_delay()
+                self.logger.warning(f"Disconnected. Reconnecting in {delay:.1f}s")
+                await asyncio.sleep(delay)
             except Exception as e:
-                self.logger.exception(f"Connection error. Reconnecting in {self.reconnect_delay}s")
                 self.current_websocket = None
-                await asyncio.sleep(self.reconnect_delay)
+                delay = self._next_reconnect_delay()
+                self.logger.exception(f"Connection error. Reconnecting in {delay:.1f}s")
+                await asyncio.sleep(delay)
 
 
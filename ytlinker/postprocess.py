@@ -0,0 +1,182 @@
+import os
+import json
+import asyncio
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from logger_config import setup_logger
+from communicator import run_in_executor, current_cancel_token
+
+# Logger configuration
+logger = setup_logger("youtube.postprocess")
+
+# Constants
+POSTPROCESS_MODE = os.getenv("YTLINKER_POSTPROCESS", "auto").lower()  # auto (if ffmpeg is installed) / on / off
+POSTPROCESS_WORKERS = int(os.getenv("YTLINKER_POSTPROCESS_WORKERS", "1"))  # Parallel ffmpeg jobs
+POSTPROCESS_QUEUE_SIZE = int(os.getenv("YTLINKER_POSTPROCESS_QUEUE", "4"))  # Max jobs waiting or running
+POSTPROCESS_THREADS = int(os.getenv("YTLINKER_POSTPROCESS_THREADS", "2"))  # ffmpeg threads per job
+POSTPROCESS_CPU_SECONDS = int(os.getenv("YTLINKER_POSTPROCESS_CPU_SECONDS", "900"))  # CPU time budget per job
+POSTPROCESS_NICE = 10  # Keep ffmpeg below downloads in scheduling priority
+TRANSCODE_MAX_RATIO = float(os.getenv("YTLINKER_TRANSCODE_MAX_RATIO", "2.0"))  # Max size/limit ratio worth re-encoding
+AUDIO_BITRATE = 128_000
+MIN_VIDEO_BITRATE = 200_000  # Below this the result is not worth sending
+SIZE_SAFETY_MARGIN = 0.92  # Room for container overhead and rate control overshoot
+CANCEL_POLL_INTERVAL = 1  # Seconds between checks of the job's cancel token while ffmpeg runs
+
+class PostProcessError(Exception):
+    """Raised when a video could not be post-processed"""
+
+def _limit_resources(pid: int) -> None:
+    """
+    Lower priority and cap CPU time of a started ffmpeg process (Linux only).
+    Applied from outside: preexec_fn can deadlock the child of a multithreaded process.
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+    if not hasattr(resource, "prlimit"):
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, pid, os.getpriority(os.PRIO_PROCESS, 0) + POSTPROCESS_NICE)
+        resource.prlimit(pid, resource.RLIMIT_CPU, (POSTPROCESS_CPU_SECONDS, POSTPROCESS_CPU_SECONDS))
+    except OSError as e:
+        # The process may already have exited
+        logger.debug(f"Could not limit resources of process {pid}: {e}")
+
+def _run(args: list[str]) -> subprocess.CompletedProcess:
+    """Run ffmpeg/ffprobe within the per-job CPU budget, killing it once the job is cancelled"""
+    token = current_cancel_token()
+    with subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as proc:
+        _limit_resources(proc.pid)
+        while True:
+            try:
+                stdout, stderr = proc.communicate(timeout=CANCEL_POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                if token and token.cancelled():
+                    proc.kill()
+                    proc.communicate()
+                    token.check()  # Raises JobCancelled with the reason
+    result = subprocess.CompletedProcess(args, proc.returncode, stdout, stderr)
+    if result.returncode != 0:
+        raise PostProcessError(f"{args[0]} exited with code {result.returncode}: {result.stderr.strip()[-500:]}")
+    return result
+
+def probe_duration(path: str) -> float:
+    """Return media duration in seconds"""
+    result = _run([
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "json", path,
+    ])
+    try:
+        return float(json.loads(result.stdout)["format"]["duration"])
+    except (KeyError, ValueError, TypeError):
+        raise PostProcessError(f"Could not read duration of {path}")
+
+def remux_faststart(src: str, dst: str) -> None:
+    """Copy streams into a new MP4 with the moov atom at the front"""
+    _run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", src,
+        "-map", "0", "-c", "copy",
+        "-movflags", "+faststart",
+        dst,
+    ])
+
+def transcode_to_size(src: str, dst: str, max_bytes: int, duration: float) -> None:
+    """Re-encode video with a bitrate that fits max_bytes"""
+    total_bitrate = max_bytes * 8 * SIZE_SAFETY_MARGIN / duration
+    video_bitrate = int(total_bitrate - AUDIO_BITRATE)
+    if video_bitrate < MIN_VIDEO_BITRATE:
+        raise PostProcessError(f"Video is too long to fit {max_bytes} bytes ({video_bitrate} bps needed)")
+
+    logger.info(f"Transcoding {src} to {video_bitrate // 1000} kbps to fit {round(max_bytes / 1024**2, 2)} MB")
+    _run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-threads", str(POSTPROCESS_THREADS),
+        "-i", src,
+        "-c:v", "libx264", "-preset", "veryfast",
+        "-b:v", str(video_bitrate), "-maxrate", str(video_bitrate), "-bufsize", str(video_bitrate * 2),
+        "-c:a", "aac", "-b:a", str(AUDIO_BITRATE),
+        "-movflags", "+faststart",
+        dst,
+    ])
+
+def process_video(path: str, max_bytes: int) -> str:
+    """
+    Replace the video at path with a Telegram-friendly version.
+    Files within the budget are only remuxed with faststart, bigger ones are re-encoded.
+    """
+    size = os.path.getsize(path)
+    tmp_path = f"{os.path.splitext(path)[0]}.pp.mp4"
+
+    try:
+        if size > max_bytes:
+            transcode_to_size(path, tmp_path, max_bytes, probe_duration(path))
+            new_size = os.path.getsize(tmp_path)
+            if new_size > max_bytes:
+                raise PostProcessError(f"Transcoded file is still too big ({new_size} bytes)")
+        else:
+            remux_faststart(path, tmp_path)
+
+        os.replace(tmp_path, path)
+        logger.info(f"Post-processed {path}: {size} -> {os.path.getsize(path)} bytes")
+        return path
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+class PostProcessor:
+    """ffmpeg stage with its own worker pool and a bounded job queue"""
+
+    def __init__(self, workers: int = POSTPROCESS_WORKERS, queue_size: int = POSTPROCESS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._workers = workers
+        self._executor = None
+        self._pending = 0  # Only touched from the event loop thread
+
+        if POSTPROCESS_MODE == "off":
+            self.enabled = False
+        else:
+            self.enabled = bool(shutil.which("ffmpeg") and shutil.which("ffprobe"))
+            if not self.enabled and POSTPROCESS_MODE == "on":
+                logger.warning("Post-processing requested but ffmpeg/ffprobe not found")
+
+    def can_fit(self, size: int, max_bytes: int) -> bool:
+        """Check whether a video of this size could be re-encoded to fit max_bytes"""
+        return self.enabled and size <= max_bytes * TRANSCODE_MAX_RATIO
+
+    async def process(self, path: str, max_bytes: int, on_abandoned: Optional[Callable[[Any], None]] = None) -> str:
+        """Post-process a downloaded video in the worker pool (on_abandoned as in communicator.run_in_executor)"""
+        if not self.enabled:
+            raise PostProcessError("Post-processing is disabled")
+        if self._pending >= self.queue_size:
+            raise PostProcessError(f"Post-processing queue is full ({self._pending} jobs)")
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="postprocess")
+
+        def release(result: Any) -> None:
+            # The worker returned after its caller gave up, only now is its place in the queue free
+            self._pending -= 1
+            if on_abandoned:
+                on_abandoned(result)
+
+        self._pending += 1
+        try:
+            result = await run_in_executor(self._executor, process_video, path, max_bytes, on_abandoned=release)
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            self._pending -= 1
+            raise
+        self._pending -= 1
+        return result
+
+    def shutdown(self) -> None:
+        """Stop the worker pool"""
+        if self._executor:
+            self._executor.shutdown(wait=True)
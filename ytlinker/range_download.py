@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import shutil
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+from logger_config import setup_logger
+
+# Logger configuration
+logger = setup_logger("youtube.range_download")
+
+# Constants
+DOWNLOADER_MODE = os.getenv("YTLINKER_DOWNLOADER", "auto").lower()  # auto / ranges / aria2c / ytdlp
+RANGE_CONNECTIONS = int(os.getenv("YTLINKER_RANGE_CONNECTIONS", "4"))  # Parallel connections per file
+MIN_RANGE_SIZE = 1024**2  # Don't split files into parts smaller than 1 MB
+CHUNK_SIZE = 256 * 1024
+RANGE_RETRIES = 3  # Attempts per range, each one continues where the previous stopped
+RANGE_RETRY_DELAY = 1  # Backoff base between attempts of a range (seconds)
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)  # Transient answers, the range is retried and its bytes kept
+READ_TIMEOUT = 15
+PROGRESS_SAVE_INTERVAL = 4 * 1024**2  # Persist range progress after this many bytes per range
+URL_EXPIRY_MARGIN = 60  # Treat stream URLs expiring within this many seconds as expired
+PART_SUFFIX = ".ranges.part"  # Differs from yt_dlp's ".part" so the two never resume each other's files
+MANIFEST_SUFFIX = ".ranges.json"
+
+class RangeDownloadError(Exception):
+    """Raised when a file could not be downloaded in ranges"""
+
+class RangesNotSupportedError(RangeDownloadError):
+    """Raised when the server answers range requests with the whole file (HTTP 200)"""
+
+class UrlExpiredError(RangeDownloadError):
+    """Raised when the stream URL is rejected (expired signature), downloaded bytes are kept"""
+
+class RangeDownloadCancelled(RangeDownloadError):
+    """Raised when the caller cancelled the download, downloaded bytes are kept"""
+
+class StreamThrottledError(RangeDownloadError):
+    """Raised when the throttled callback asks for a fresh stream URL, downloaded bytes are kept"""
+
+def aria2c_available() -> bool:
+    """Check whether aria2c can be used as external downloader"""
+    return shutil.which("aria2c") is not None
+
+def use_aria2c() -> bool:
+    """aria2c is used when requested, or in auto mode when installed"""
+    return DOWNLOADER_MODE in ("auto", "aria2c") and aria2c_available()
+
+def use_ranges() -> bool:
+    """Built-in range downloader is used when requested, or in auto mode without aria2c"""
+    return DOWNLOADER_MODE == "ranges" or (DOWNLOADER_MODE == "auto" and not aria2c_available())
+
+def aria2c_options(connections: int = RANGE_CONNECTIONS) -> dict:
+    """yt_dlp options delegating plain HTTP(S) downloads to aria2c"""
+    return {
+        'external_downloader': {'http': 'aria2c'},
+        'external_downloader_args': {'aria2c': [
+            '-x', str(connections), '-s', str(connections),
+            '-k', '1M', '--file-allocation=falloc',
+        ]},
+    }
+
+def is_progressive(info: dict) -> bool:
+    """Whether yt_dlp selected one plain HTTP(S) file of known size (no fragments, no merge)"""
+    return (
+        not info.get('requested_formats')
+        and info.get('protocol') in ('http', 'https')
+        and bool(info.get('url'))
+        and bool(info.get('filesize'))
+    )
+
+def url_expires_soon(url: str, margin: int = URL_EXPIRY_MARGIN) -> bool:
+    """Check the 'expire' timestamp of signed stream URLs (googlevideo)"""
+    expire = parse_qs(urlparse(url).query).get("expire")
+    try:
+        return bool(expire) and int(expire[0]) - time.time() < margin
+    except ValueError:
+        return False
+
+def discard_partial(path: str) -> None:
+    """Remove partial file and progress manifest of a range download"""
+    for leftover in (path + PART_SUFFIX, path + MANIFEST_SUFFIX):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+def split_ranges(total_size: int, connections: int) -> List[Tuple[int, int]]:
+    """Split [0, total_size) into inclusive byte ranges of (almost) equal size"""
+    parts = max(1, min(connections, total_size // MIN_RANGE_SIZE))
+    part_size = -(-total_size // parts)  # ceil
+    return [(start, min(start + part_size, total_size) - 1) for start in range(0, total_size, part_size)]
+
+def _preallocate(path: str, total_size: int) -> None:
+    """Create the target file with its final size so ranges can be written in place"""
+    with open(path, "wb") as f:
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(f.fileno(), 0, total_size)
+                return
+            except OSError:
+                pass
+        f.truncate(total_size)
+
+class _Progress:
+    """Per-range download positions, persisted next to the partial file for resuming"""
+
+    def __init__(self, path: str, total_size: int, ranges: List[Tuple[int, int]], validator: str):
+        self.manifest_path = path + MANIFEST_SUFFIX
+        self.total_size = total_size
+        self.ranges = ranges
+        self.validator = validator
+        self.positions = [start for start, _ in ranges]
+        self._lock = threading.Lock()
+
+    def load(self, part_path: str) -> bool:
+        """Restore positions if the partial file belongs to the same format and size"""
+        try:
+            with open(self.manifest_path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if (saved.get("size") != self.total_size
+                or saved.get("validator") != self.validator
+                or [tuple(r) for r in saved.get("ranges", [])] != self.ranges
+                or not os.path.exists(part_path)
+                or os.path.getsize(part_path) != self.total_size):
+            logger.info("Partial download does not match the selected format, starting over")
+            return False
+
+        self.positions = saved["positions"]
+        return True
+
+    def save(self) -> None:
+        """Write positions to the manifest"""
+        with self._lock:
+            data = {
+                "size": self.total_size,
+                "validator": self.validator,
+                "ranges": self.ranges,
+                "positions": list(self.positions),
+            }
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.manifest_path)
+
+    @property
+    def downloaded(self) -> int:
+        """Bytes already on disk"""
+        return sum(position - start for position, (start, _) in zip(self.positions, self.ranges))
+
+def _fetch_range(
+    session,
+    url: str,
+    headers: Dict[str, str],
+    part_path: str,
+    progress: _Progress,
+    index: int,
+    cancelled: Optional[Callable[[], bool]] = None,
+    throttled: Optional[Callable[[int], bool]] = None,
+) -> None:
+    """Download one byte range into its place in the file, continuing from the saved position"""
+    start, end = progress.ranges[index]
+    last_error: Optional[Exception] = None
+
+    for attempt in range(RANGE_RETRIES):
+        position = progress.positions[index]
+        if position > end:
+            return
+        if attempt:
+            time.sleep(RANGE_RETRY_DELAY * 2 ** (attempt - 1))
+        if cancelled and cancelled():
+            raise RangeDownloadCancelled(f"Range {start}-{end} cancelled at byte {position}")
+        try:
+            with session.get(
+                url,
+                headers={**headers, "Range": f"bytes={position}-{end}"},
+                stream=True,
+                timeout=READ_TIMEOUT,
+            ) as response:
+                if response.status_code in (403, 410):
+                    raise UrlExpiredError(f"Stream URL rejected (HTTP {response.status_code})")
+                if response.status_code == 200:
+                    raise RangesNotSupportedError("Server ignored range request (HTTP 200)")
+                if response.status_code in RETRYABLE_STATUS:
+                    raise IOError(f"HTTP {response.status_code}")
+                if response.status_code != 206:
+                    raise RangeDownloadError(f"Range request failed (HTTP {response.status_code})")
+                with open(part_path, "r+b") as f:
+                    f.seek(position)
+                    unsaved = 0
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        if cancelled and cancelled():
+                            raise RangeDownloadCancelled(f"Range {start}-{end} cancelled at byte {position}")
+                        remaining = end + 1 - position
+                        if len(chunk) > remaining:
+                            chunk = chunk[:remaining]
+                        f.write(chunk)
+                        position += len(chunk)
+                        progress.positions[index] = position
+                        unsaved += len(chunk)
+                        if unsaved >= PROGRESS_SAVE_INTERVAL:
+                            f.flush()
+                            progress.save()
+                            unsaved = 0
+                        if throttled and throttled(progress.downloaded):
+                            raise StreamThrottledError(f"Range {start}-{end} throttled at byte {position}")
+                        if position > end:
+                            break
+            if position > end:
+                return
+        except RangeDownloadError:
+            raise
+        except Exception as e:
+            last_error = e
+            logger.debug(f"Range {start}-{end} interrupted at {position} (attempt {attempt + 1}/{RANGE_RETRIES}): {e}")
+
+    raise RangeDownloadError(f"Range {start}-{end} failed at byte {progress.positions[index]}: {last_error}")
+
+def download(
+    url: str,
+    path: str,
+    total_size: int,
+    session,
+    headers: Optional[Dict[str, str]] = None,
+    connections: int = RANGE_CONNECTIONS,
+    validator: str = "",
+    cancelled: Optional[Callable[[], bool]] = None,
+    throttled: Optional[Callable[[int], bool]] = None,
+) -> None:
+    """
+    Download a file over several connections at once.
+
+    The partial file is preallocated and every connection writes its byte range
+    in place. Progress is kept in a manifest, so a later call for the same path,
+    size and validator (e.g. format ID) continues where this one stopped, even
+    with a freshly extracted URL. The file is moved to path once complete.
+    The cancelled callback is polled for every chunk, the throttled callback
+    gets the bytes downloaded so far after every chunk and stops the download
+    with StreamThrottledError when it returns True.
+    """
+    headers = headers or {}
+    part_path = path + PART_SUFFIX
+    progress = _Progress(path, total_size, split_ranges(total_size, connections), validator)
+
+    if progress.load(part_path):
+        logger.info(f"Resuming range download of {path} at {progress.downloaded}/{total_size} bytes")
+    else:
+        _preallocate(part_path, total_size)
+        logger.info(f"Downloading {total_size} bytes in {len(progress.ranges)} ranges to {path}")
+
+    aborted = threading.Event()
+
+    def stopped() -> bool:
+        return aborted.is_set() or bool(cancelled and cancelled())
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(progress.ranges), thread_name_prefix="range") as pool:
+            futures = [
+                pool.submit(_fetch_range, session, url, headers, part_path, progress, index, stopped, throttled)
+                for index in range(len(progress.ranges))
+            ]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            failed = next((future for future in done if future.exception()), None)
+            if failed:
+                aborted.set()  # Stop the other ranges, their bytes are kept
+                raise failed.exception()
+    except RangesNotSupportedError:
+        discard_partial(path)
+        raise
+    except Exception:
+        # Keep the partial file and its progress for the next attempt
+        progress.save()
+        raise
+
+    os.replace(part_path, path)
+    discard_partial(path)
@@ -0,0 +1,94 @@
+import os
+import time
+import threading
+from collections import deque
+from logger_config import setup_logger
+from communicator import metrics
+
+# Logger configuration
+logger = setup_logger("youtube.throttle")
+
+# Constants
+THROTTLE_MIN_SPEED = int(os.getenv("YTLINKER_THROTTLE_MIN_SPEED", str(100 * 1024)))  # Bytes/s, 0 disables detection
+THROTTLE_WINDOW = float(os.getenv("YTLINKER_THROTTLE_WINDOW", "10"))  # Seconds the speed must stay below the floor
+THROTTLE_GRACE = 5  # Seconds after a (re)start before the speed is judged
+MAX_THROTTLE_RESTARTS = int(os.getenv("YTLINKER_THROTTLE_MAX_RESTARTS", "3"))  # Per job, then the download continues as is
+
+class ThrottleMonitor:
+    """
+    Detects throttled stream URLs from download progress.
+
+    When the average speed over the last THROTTLE_WINDOW seconds stays below
+    the floor, the yt_dlp hook raises ThrottledDownload. yt_dlp then
+    re-extracts the video (fresh stream URL) and resumes the .part file.
+    The built-in range downloader reports its progress through observe and
+    restarts with a fresh URL itself.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        min_speed: int = THROTTLE_MIN_SPEED,
+        window: float = THROTTLE_WINDOW,
+        max_restarts: int = MAX_THROTTLE_RESTARTS,
+    ):
+        self.url = url
+        self.min_speed = min_speed
+        self.window = window
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self._samples: deque = deque()  # (monotonic time, downloaded bytes)
+        self._started_at = time.monotonic()
+        self._lock = threading.Lock()  # observe is called from every range thread
+
+    def _reset(self) -> None:
+        """Start measuring again (new file or restarted download)"""
+        self._samples.clear()
+        self._started_at = time.monotonic()
+
+    def hook(self, status: dict) -> None:
+        """Progress hook registered with YoutubeDL"""
+        if status.get("status") == "downloading" and self.observe(status.get("downloaded_bytes") or 0):
+            from yt_dlp.utils import ThrottledDownload
+            raise ThrottledDownload()
+
+    def observe(self, downloaded: int) -> bool:
+        """Record the bytes downloaded so far, returns True when the download should restart with a fresh URL"""
+        if not self.min_speed:
+            return False
+
+        with self._lock:
+            now = time.monotonic()
+            samples = self._samples
+            if samples and downloaded < samples[-1][1]:
+                self._reset()
+            samples.append((now, downloaded))
+
+            # Keep exactly one sample older than the window as the reference point
+            while len(samples) > 1 and now - samples[1][0] >= self.window:
+                samples.popleft()
+
+            span = now - samples[0][0]
+            if span < self.window or now - self._started_at < THROTTLE_GRACE:
+                return False
+
+            speed = (downloaded - samples[0][1]) / span
+            if speed >= self.min_speed:
+                return False
+
+            metrics.increment("youtube_throttle_events")
+            if self.restarts >= self.max_restarts:
+                logger.warning(
+                    f"Download still throttled at {speed / 1024:.1f} KB/s after {self.restarts} restarts, continuing: {self.url}"
+                )
+                self._reset()
+                return False
+
+            self.restarts += 1
+            metrics.increment("youtube_throttle_restarts")
+            logger.warning(
+                f"Download throttled at {speed / 1024:.1f} KB/s for {self.window:.0f}s, "
+                f"re-extracting stream URL (restart {self.restarts}/{self.max_restarts}): {self.url}"
+            )
+            self._reset()
+            return True
@@ -0,0 +1,129 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from logger_config import setup_logger
+
+# Logger configuration
+logger = setup_logger("youtube.ydl_pool")
+
+# Constants
+DEFAULT_MAX_USES = 200  # Recreate an instance after this many jobs to keep memory bounded
+_MISSING = object()
+
+class YoutubeDLPool:
+    """
+    Long-lived YoutubeDL instances, one per worker thread.
+
+    Building a YoutubeDL parses the cookie file and sets up extractors and the
+    opener; keeping the instance also keeps extractor caches such as player JS
+    and signature functions. Cookies are written back after every job (YouTube
+    rotates session cookies), all instances are rebuilt when the cookie file is
+    replaced from outside.
+    """
+
+    def __init__(self, options: Dict[str, Any], max_uses: int = DEFAULT_MAX_USES):
+        self.options = dict(options)
+        self.max_uses = max_uses
+        self._local = threading.local()
+        self._cookie_lock = threading.Lock()  # Cookie file is read and written by all threads' instances
+        self._known_mtime: Optional[float] = None  # Cookie file mtime last seen or written by the pool
+        self._generation = 0  # Increased when the cookie file is replaced from outside
+
+    def _cookie_mtime(self) -> Optional[float]:
+        """Modification time of the configured cookie file (None if there is none)"""
+        cookiefile = self.options.get("cookiefile")
+        if not cookiefile:
+            return None
+        try:
+            return os.stat(cookiefile).st_mtime
+        except OSError:
+            return None
+
+    def _check_cookie_file(self) -> None:
+        """Start a new generation if the cookie file changed other than by the pool (call under the lock)"""
+        cookie_mtime = self._cookie_mtime()
+        if cookie_mtime != self._known_mtime:
+            self._known_mtime = cookie_mtime
+            self._generation += 1
+
+    def _save_cookies(self, ydl) -> None:
+        """Write the instance's cookie jar back to the cookie file, as a per-job YoutubeDL did on exit"""
+        if not self.options.get("cookiefile"):
+            return
+        with self._cookie_lock:
+            self._check_cookie_file()
+            if self._local.generation != self._generation:
+                return  # Keep the replaced file, the instance is rebuilt on next use
+            try:
+                ydl.save_cookies()
+            except Exception as e:
+                logger.warning(f"Could not save cookies: {e}")
+                return
+            # The pool's own write must not look like a replaced file
+            self._known_mtime = self._cookie_mtime()
+
+    def _close(self, ydl) -> None:
+        """Release resources of a discarded instance"""
+        try:
+            # Cookies were saved after its last job, don't write them over a replaced file
+            ydl.params["cookiefile"] = None
+            if hasattr(ydl, "close"):
+                ydl.close()
+        except Exception as e:
+            logger.debug(f"Error closing YoutubeDL instance: {e}")
+
+    def _instance(self):
+        """Return this thread's instance, creating or refreshing it when needed"""
+        import yt_dlp
+        local = self._local
+        ydl = getattr(local, "ydl", None)
+
+        with self._cookie_lock:
+            self._check_cookie_file()
+            if ydl is not None:
+                replaced = local.generation != self._generation
+                if replaced or local.uses >= self.max_uses:
+                    reason = "cookie file changed" if replaced else "max uses reached"
+                    logger.info(f"Refreshing YoutubeDL instance ({reason})")
+                    self._close(ydl)
+                    ydl = None
+
+            if ydl is None:
+                # Built under the lock, so it never loads a cookie file another instance is writing
+                ydl = yt_dlp.YoutubeDL(dict(self.options))
+                local.ydl = ydl
+                local.generation = self._generation
+                local.uses = 0
+                logger.debug(f"Created YoutubeDL instance for thread {threading.current_thread().name}")
+
+        local.uses += 1
+        return ydl
+
+    @contextmanager
+    def acquire(self, progress_hooks=(), **job_options):
+        """
+        Borrow this thread's instance with per-job options (e.g. outtmpl) and
+        progress hooks applied. Options are restored and hooks removed when the job is done.
+        """
+        ydl = self._instance()
+        for hook in progress_hooks:
+            ydl.add_progress_hook(hook)
+        if "outtmpl" in job_options and not isinstance(job_options["outtmpl"], dict):
+            # Keep yt_dlp's other default templates (thumbnails, chapters, ...)
+            job_options["outtmpl"] = {**ydl.params.get("outtmpl", {}), "default": job_options["outtmpl"]}
+
+        saved = {key: ydl.params.get(key, _MISSING) for key in job_options}
+        ydl.params.update(job_options)
+        try:
+            yield ydl
+        finally:
+            self._save_cookies(ydl)
+            for hook in progress_hooks:
+                if hook in ydl._progress_hooks:
+                    ydl._progress_hooks.remove(hook)
+            for key, value in saved.items():
+                if value is _MISSING:
+                    ydl.params.pop(key, None)
+                else:
+                    ydl.params[key] = value
@@ -2,15 +2,22 @@
 import json
 import asyncio
 import re
-import requests
 import uuid
 from html import unescape
 from concurrent.futures import ThreadPoolExecutor
-import yt_dlp
 from logger_config import setup_logger, configure_logging
-from communicator import WebSocketCommunicator, MediaType, MediaItem, FetchResult
+from communicator import (
+    WebSocketCommunicator, MediaType, MediaItem, FetchResult, AdaptiveLimiter, Hedger, JobCancelled,
+    iterate_in_executor, run_in_executor, check_cancelled, current_cancel_token, startup_timings
+)
 from urllib.parse import urlparse, parse_qs, unquote
 from functools import lru_cache  
+from postprocess import PostProcessor, PostProcessError
+from ydl_pool import YoutubeDLPool
+import range_download
+from throttle import ThrottleMonitor
+import profiling
+# yt_dlp and requests are heavy to import, they are loaded lazily (see warm_up)
 
 # Logger configuration
 configure_logging()
@@ -20,10 +27,21 @@ logger = setup_logger("youtube.linker")
 VERSION = "A4"
 MAX_RETRIES = 2
 RETRY_DELAY = 1.5 
-MAX_WORKERS = 4
+INITIAL_WORKERS = 4  # Starting concurrency, adjusted from observed latency and errors
+MIN_WORKERS = int(os.getenv("YTLINKER_MIN_WORKERS", "1"))  # Concurrency floor
+MAX_WORKERS = int(os.getenv("YTLINKER_MAX_WORKERS", str(min(16, (os.cpu_count() or 1) * 4))))  # Concurrency ceiling (executor size)
 DEFAULT_DOWNLOAD_FOLDER = r"C:\OwnDownloaderBot\testfolder"  # Default download folder
 DOWNLOAD_FOLDER = os.getenv("DOWNLOAD_FOLDER", DEFAULT_DOWNLOAD_FOLDER)  # Download folder from environment variable, or default
 MAX_VIDEO_SIZE_BYTES = int(os.getenv("YTLINKER_MAX_VIDEO_SIZE", str(4 * 1024**3)))  # 4GB limit
+MAX_URL_REFRESHES = 2  # Re-extractions of an expired stream URL within one attempt
+YTDLP_MANIFEST_SUFFIX = ".ytdlp.json"  # Format and size of the .part file yt_dlp resumes
+
+# Time budget per content class (seconds), the job is cancelled once it runs out
+JOB_DEADLINES = {
+    "community": int(os.getenv("YTLINKER_DEADLINE_COMMUNITY", "60")),
+    "shorts": int(os.getenv("YTLINKER_DEADLINE_SHORTS", "180")),
+    "video": int(os.getenv("YTLINKER_DEADLINE_VIDEO", "900")),
+}
 
 # Necessary regex
 RE_INITIAL_DATA = re.compile(r"ytInitialData\s*=\s*({.*?});?\s*</script>", re.DOTALL)
@@ -32,19 +50,52 @@ RE_IMAGE_QUALITY = re.compile(r"=s(\d+)-")
 # Thread pool for CPU-bound operations
 executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
 
+# Adaptive limit of concurrent jobs in the executor
+limiter = AdaptiveLimiter("youtube", INITIAL_WORKERS, MIN_WORKERS, MAX_WORKERS)
+
+# ffmpeg remux/transcode stage with its own worker pool
+postprocessor = PostProcessor()
+
+# yt_dlp options shared by every download (outtmpl is set per job)
+YDL_BASE_OPTIONS = {
+    'format': '22/18/best[ext=mp4]',  #398 Is video without sound oopsie)  720p 480p existing format with sound)
+    'quiet': True,
+    'no_warnings': True,
+    'noplaylist': True, 
+    'concurrent_fragment_downloads': 4,
+    'cookiefile': 'cookies.txt',
+    'socket_timeout': 15,  # Network socket timeout 
+    'continuedl': True,  # Resume .part files left by a failed attempt
+}
+
+# Warm YoutubeDL instances reused across jobs (one per executor thread)
+ydl_pool = YoutubeDLPool(YDL_BASE_OPTIONS)
+
+# Optional hedging of metadata extraction (HEDGE_METADATA), attempts run on the hedge threads' own instances
+metadata_hedger = Hedger("youtube_metadata", workers=MAX_WORKERS * 2)
+
 # Reusable HTTP session (reuse TCP/TLS connections instead of creating a new one per request)
 _session = None
+_http_adapter_factory = None  # Set by the multi-platform host to share connection pools
 def get_http_session():
     """Lazily create and return a shared requests.Session with default headers."""
     global _session
     if _session is None:
+        import requests
         _session = requests.Session()
+        if _http_adapter_factory:
+            adapter = _http_adapter_factory()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
         _session.headers.update({
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
             "Accept-Language": "en-US,en;q=0.9",
         })
     return _session
 
+class VideoTooLargeError(Exception):
+    """Raised when a video exceeds the size limit and cannot be transcoded to fit, before anything is downloaded"""
+
 # YouTube content type detection
 def is_shorts(url: str) -> bool:
     """Determine if a URL is a YouTube Shorts video"""
@@ -156,12 +207,142 @@ def extract_post_content(post_url: str) -> dict:
     logger.info(f"Post contains: text={bool(post_text)}, images={len(best_images)}")
     return {"text": post_text, "images": best_images}
 
-def _fetch_media_items_sync(url: str) -> list[MediaItem]:
+def _iter_community_post_items(url: str):
+    """Yield text and image items of a YouTube Community post"""
+    post_content = extract_post_content(url)
+    
+    # Text content first, if available
+    if post_content["text"]:
+        yield MediaItem(
+            type=MediaType.TEXT,
+            content=post_content["text"]
+        )
+        
+    # All images, if available
+    for image_url in post_content["images"]:
+        yield MediaItem(
+            type=MediaType.PHOTO,
+            url=image_url
+        )
+
+def content_class(url: str) -> str:
+    """Content class of a URL: community, shorts or video"""
+    if is_community_post(url):
+        return "community"
+    return "shorts" if is_shorts(url) else "video"
+
+def job_deadline(url: str) -> float:
+    """Time budget of a URL by its content class"""
+    return JOB_DEADLINES[content_class(url)]
+
+def _cancel_hook(status: dict) -> None:
+    """yt_dlp progress hook stopping the download once the job is cancelled"""
+    check_cancelled()
+
+def job_file_path(job_id: str) -> str:
+    """Deterministic download path of a job, shared by all of its attempts"""
+    return os.path.join(DOWNLOAD_FOLDER, f"youtube_{job_id}.mp4")
+
+def _discard_partial_download(file_path: str) -> None:
+    """Remove everything a failed job left behind (yt_dlp .part, range partial, incomplete file)"""
+    range_download.discard_partial(file_path)
+    for leftover in (file_path + ".part", file_path + ".part.aria2", file_path + YTDLP_MANIFEST_SUFFIX, file_path):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+            logger.info(f"Removed partial download: {leftover}")
+
+def _check_ytdlp_partial(file_path: str, info: dict) -> None:
+    """
+    Drop the .part file of a previous attempt if it belongs to another format or size
+    than the one selected now (yt_dlp would append to it blindly), then record the selection.
+    """
+    manifest_path = file_path + YTDLP_MANIFEST_SUFFIX
+    selected = {
+        "format_id": str(info.get('format_id', "")),
+        "size": info.get('filesize') or info.get('filesize_approx'),
+    }
+    try:
+        with open(manifest_path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        saved = None
+    if saved == selected:
+        return
+    
+    for leftover in (file_path + ".part", file_path + ".part.aria2"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+            logger.info(f"Partial download does not match format {selected['format_id']}, removed {leftover}")
+    with open(manifest_path, "w") as f:
+        json.dump(selected, f)
+
+def _extract_metadata(ydl, url: str) -> dict:
+    """Extract video info without downloading, hedged when enabled"""
+    if not metadata_hedger.enabled:
+        return ydl.extract_info(url, download=False)
+    
+    def attempt() -> dict:
+        # Runs on a hedge thread, which takes its own pooled instance
+        with ydl_pool.acquire() as hedge_ydl:
+            return hedge_ydl.extract_info(url, download=False)
+    
+    # On the job's thread the job's instance is used, a nested acquire could replace it under the job
+    return metadata_hedger.call(attempt, inline=lambda: ydl.extract_info(url, download=False))
+
+def _download_in_ranges(ydl, url: str, info: dict, file_path: str, throttle_monitor: ThrottleMonitor) -> bool:
+    """
+    Download the selected progressive format in parallel byte ranges.
+    Expired or throttled stream URLs are re-extracted and the download continues with the bytes already on disk.
+    Returns False if yt_dlp should download the file instead.
+    """
+    refreshes = 0
+    reextract = range_download.url_expires_soon(info['url'])
+    while True:
+        if reextract:
+            logger.info(f"Re-extracting stream URL: {url}")
+            info = ydl.extract_info(url, download=False)
+            if not info or not range_download.is_progressive(info):
+                break
+        token = current_cancel_token()
+        try:
+            range_download.download(
+                info['url'],
+                file_path,
+                info['filesize'],
+                session=get_http_session(),
+                headers=info.get('http_headers'),
+                validator=str(info.get('format_id', "")),
+                cancelled=token.cancelled if token else None,
+                throttled=throttle_monitor.observe,
+            )
+            return True
+        except range_download.RangeDownloadCancelled:
+            check_cancelled()
+            raise
+        except range_download.StreamThrottledError as e:
+            # The monitor limits the restarts, afterwards it lets the download continue
+            logger.warning(f"{e}, keeping {file_path} partial")
+        except range_download.UrlExpiredError as e:
+            if refreshes >= MAX_URL_REFRESHES:
+                break
+            refreshes += 1
+            logger.warning(f"{e}, keeping {file_path} partial")
+        except range_download.RangesNotSupportedError as e:
+            logger.warning(f"{e}, falling back to yt_dlp")
+            return False
+        reextract = True
+    
+    range_download.discard_partial(file_path)
+    return False
+
+def _fetch_media_items_sync(url: str, job_id: str | None = None) -> list[MediaItem]:
     """
     Synchronous function to fetch media items from a YouTube URL.
     For videos, saves them locally and returns file:// URIs.
+    Attempts with the same job_id write to the same path and resume each other's partial downloads.
     """
     media_items = []
+    file_path = None
     
     try:
         # Create download folder if it doesn't exist
@@ -169,46 +350,24 @@ def _fetch_media_items_sync(url: str) -> list[MediaItem]:
         
         # Handle community posts
         if is_community_post(url):
-            post_content = extract_post_content(url)
-            
-            # Add text content if available
-            if post_content["text"]:
-                media_items.append(MediaItem(
-                    type=MediaType.TEXT,
-                    content=post_content["text"]
-                ))
-                
-            # Add all images if available
-            for image_url in post_content["images"]:
-                media_items.append(MediaItem(
-                    type=MediaType.PHOTO,
-                    url=image_url
-                ))
-                
+            media_items.extend(_iter_community_post_items(url))
             return media_items
         
         # Handle videos (both regular and shorts)
         content_type = "shorts" if is_shorts(url) else "video"
         logger.info(f"Fetching content: {url} ({content_type})")
         
-        # Generate unique filename
-        video_id = str(uuid.uuid4())[:8]
-        filename = f"youtube_{video_id}.mp4"
-        file_path = os.path.join(DOWNLOAD_FOLDER, filename)
+        # Per-job filename (unique per job, same for its retries)
+        file_path = job_file_path(job_id or uuid.uuid4().hex[:8])
         
         # Download video
-        with yt_dlp.YoutubeDL({
-            'format': '22/18/best[ext=mp4]',  #398 Is video without sound oopsie)  720p 480p existing format with sound)
-            'quiet': True,
-            'no_warnings': True,
-            'noplaylist': True, 
-            'outtmpl': file_path,
-            'concurrent_fragment_downloads': 4,
-            'cookiefile': 'cookies.txt',
-            'socket_timeout': 15,  # Network socket timeout 
-        }) as ydl:
+        downloader_options = range_download.aria2c_options() if range_download.use_aria2c() else {}
+        throttle_monitor = ThrottleMonitor(url)
+        progress_hooks = [_cancel_hook, throttle_monitor.hook]
+        with ydl_pool.acquire(progress_hooks=progress_hooks, outtmpl=file_path, **downloader_options) as ydl:
             # First: probe info (no download)
-            info = ydl.extract_info(url, download=False)
+            info = _extract_metadata(ydl, url)
+            check_cancelled()
             
             if info:
                 # Determine total size of the chosen (or best) format(s)
@@ -229,13 +388,19 @@ def _fetch_media_items_sync(url: str) -> list[MediaItem]:
                 if total_size and total_size > MAX_VIDEO_SIZE_BYTES:
                     human_mb = round(total_size / (1024**2), 2)
                     limit_mb = round(MAX_VIDEO_SIZE_BYTES / (1024**2), 2)
-                    logger.error(
-                        f"Aborting download: estimated size {human_mb} MB exceeds limit {limit_mb} MB (url={url})"
-                    )
-                    return []
+                    if not postprocessor.can_fit(total_size, MAX_VIDEO_SIZE_BYTES):
+                        raise VideoTooLargeError(
+                            f"Aborting download: estimated size {human_mb} MB exceeds limit {limit_mb} MB (url={url})"
+                        )
+                    logger.info(f"Estimated size {human_mb} MB exceeds limit {limit_mb} MB, will transcode after download")
                 
-                # Proceed to actual download
-                info = ydl.extract_info(url, download=True)
+                # Proceed to actual download: single progressive files over several connections, the rest via yt_dlp
+                if not (range_download.use_ranges() and range_download.is_progressive(info)
+                        and _download_in_ranges(ydl, url, info, file_path, throttle_monitor)):
+                    _check_ytdlp_partial(file_path, info)
+                    info = ydl.extract_info(url, download=True)
+                    if os.path.exists(file_path + YTDLP_MANIFEST_SUFFIX):
+                        os.remove(file_path + YTDLP_MANIFEST_SUFFIX)
             
             if info:
                 # Check if file was successfully downloaded
@@ -258,21 +423,81 @@ def _fetch_media_items_sync(url: str) -> list[MediaItem]:
                     logger.info(f"File URI: {file_uri}")
                 else:
                     logger.error(f"Failed to save video to {file_path}")
+    except JobCancelled as e:
+        logger.warning(f"{e}, stopped {url}")
+        if file_path:
+            _discard_partial_download(file_path)
+        raise
+    except VideoTooLargeError as e:
+        logger.error(str(e))
+        raise
     except Exception as e:
         logger.exception(f"Error fetching content: {e}")
     
     return media_items
 
+async def _postprocess_videos(media_items: list[MediaItem]) -> str | None:
+    """
+    Run downloaded videos through the ffmpeg stage.
+    Returns an error message if a video still does not fit the size limit.
+    """
+    for item in media_items:
+        if item.type != MediaType.VIDEO or not item.url.startswith("file://"):
+            continue
+        
+        file_path = item.url[len("file://"):]
+        if postprocessor.enabled:
+            try:
+                # A cancelled job's file is removed once ffmpeg is done replacing it
+                await postprocessor.process(
+                    file_path, MAX_VIDEO_SIZE_BYTES, on_abandoned=lambda _: _discard_partial_download(file_path)
+                )
+            except PostProcessError as e:
+                logger.warning(f"Post-processing failed for {file_path}: {e}")
+        
+        if os.path.getsize(file_path) > MAX_VIDEO_SIZE_BYTES:
+            logger.error(f"Video {file_path} exceeds size limit, removing it")
+            os.remove(file_path)
+            return "Video is too large to send"
+    return None
+
 async def fetch_media_items(url: str) -> FetchResult:
     """Asynchronous wrapper for _fetch_media_items_sync with retry logic"""
+    # Same job ID for every attempt, so a retry resumes the partial download of the previous one
+    job_id = uuid.uuid4().hex[:8]
+    result = None
+    try:
+        result = await _fetch_with_retries(url, job_id)
+    finally:
+        # Also when the caller gave up on the job (cancelled while awaiting a worker)
+        if result is None or not result.media:
+            _discard_partial_download(job_file_path(job_id))
+    return result
+
+async def _fetch_with_retries(url: str, job_id: str) -> FetchResult:
+    """Run _fetch_media_items_sync in the executor, retrying with exponential backoff"""
     for attempt in range(MAX_RETRIES):
         try:
+            check_cancelled()
             logger.info(f"Processing URL: {url} (attempt {attempt+1}/{MAX_RETRIES})")
             
-            # Use thread executor for CPU-bound operations
-            media_items = await asyncio.get_running_loop().run_in_executor(
-                executor, _fetch_media_items_sync, url
-            )
+            # Use thread executor for CPU-bound operations, within the adaptive limit
+            async with limiter.slot(content_class(url)) as slot:
+                try:
+                    media_items = await run_in_executor(
+                        executor, _fetch_media_items_sync, url, job_id,
+                        on_abandoned=lambda _: _discard_partial_download(job_file_path(job_id))
+                    )
+                except VideoTooLargeError:
+                    slot.counted = False  # Refused by the size limit, says nothing about YouTube
+                    raise
+                # _fetch_media_items_sync logs errors and returns nothing
+                slot.failed = not media_items
+                # Compare download latency per MB, a long video is not a congested upstream
+                slot.work = sum(
+                    os.path.getsize(item.url[len("file://"):]) for item in media_items
+                    if item.url.startswith("file://") and os.path.exists(item.url[len("file://"):])
+                ) / 1024**2 or 1.0
             
             if not media_items and attempt < MAX_RETRIES - 1:
                 retry_delay = RETRY_DELAY * (2 ** attempt)
@@ -281,8 +506,16 @@ async def fetch_media_items(url: str) -> FetchResult:
                 continue
                 
             logger.info(f"Retrieved {len(media_items)} media items")
+            check_cancelled()
+            if error := await _postprocess_videos(media_items):
+                return FetchResult(media=[], error=error)
             return FetchResult(media=media_items)
-            
+        
+        except JobCancelled as e:
+            logger.warning(f"{e}: {url}")
+            return FetchResult(media=[], error="Request timed out")
+        except VideoTooLargeError:
+            return FetchResult(media=[], error="Video is too large to send")
         except Exception as e:
             error_message = str(e)
             logger.error(f"Error fetching media: {error_message}", exc_info=True)
@@ -298,14 +531,98 @@ async def fetch_media_items(url: str) -> FetchResult:
     logger.error("Maximum retry attempts reached")
     return FetchResult(media=[], error="Maximum retry attempts reached")
 
+async def stream_media_items(url: str):
+    """
+    Streaming variant of fetch_media_items used in streaming response mode.
+    Community post items are yielded as soon as the post is parsed; videos are
+    a single item and go through the regular retry logic.
+    """
+    if is_community_post(url):
+        logger.info(f"Streaming community post: {url}")
+        async with limiter.slot("community"):
+            async for item in iterate_in_executor(executor, _iter_community_post_items, url):
+                yield item
+        return
+    
+    result = await fetch_media_items(url)
+    if result.error:
+        raise RuntimeError(result.error)
+    for item in result.media:
+        yield item
+
+def _expand_playlist_sync(url: str, limit: int) -> list[str]:
+    """List video URLs of a YouTube playlist without resolving the videos"""
+    with ydl_pool.acquire(noplaylist=False, extract_flat='in_playlist', playlistend=limit) as ydl:
+        info = ydl.extract_info(url, download=False)
+    
+    urls = []
+    for entry in (info or {}).get('entries') or []:
+        if not entry:
+            continue
+        entry_url = entry.get('url') or ""
+        if not entry_url.startswith("http") and entry.get('id'):
+            entry_url = f"https://www.youtube.com/watch?v={entry['id']}"
+        if entry_url:
+            urls.append(entry_url)
+    
+    logger.info(f"Playlist {url} expanded to {len(urls)} videos")
+    return urls[:limit]
+
+async def expand_playlist(url: str, limit: int) -> list[str]:
+    """Asynchronous wrapper for _expand_playlist_sync"""
+    return await asyncio.get_running_loop().run_in_executor(executor, _expand_playlist_sync, url, limit)
+
+def warm_up() -> None:
+    """Import yt_dlp, load its extractors and open the HTTP session ahead of the first request"""
+    import yt_dlp
+    startup_timings.mark("yt_dlp_import")
+    
+    # Building an instance loads the extractor registry and parses the cookie file
+    with ydl_pool.acquire() as ydl:
+        ydl.get_info_extractor("Youtube")
+    get_http_session()
+    logger.info("yt_dlp warm-up finished")
+
+async def warm_up_async() -> None:
+    """Run warm-up in the executor without blocking the event loop"""
+    await asyncio.get_running_loop().run_in_executor(executor, warm_up)
+
+def share_resources(shared_executor=None, http_adapter_factory=None, max_workers: int | None = None) -> None:
+    """
+    Use executor and HTTP connection pools shared with other platforms (multi-platform host).
+    max_workers is the shared thread budget: the concurrency ceiling, batch concurrency and
+    hedge pool are scaled down to it.
+    """
+    global executor, _http_adapter_factory, MAX_WORKERS, limiter, metadata_hedger
+    if shared_executor:
+        executor = shared_executor
+    if http_adapter_factory:
+        _http_adapter_factory = http_adapter_factory
+    if max_workers:
+        MAX_WORKERS = min(MAX_WORKERS, max_workers)
+        limiter = AdaptiveLimiter("youtube", min(INITIAL_WORKERS, MAX_WORKERS), MIN_WORKERS, MAX_WORKERS)
+        metadata_hedger = Hedger("youtube_metadata", workers=MAX_WORKERS)
+
+def create_communicator() -> WebSocketCommunicator:
+    """Create communicator registering this linker as the youtube platform"""
+    # Register with tgbot first, heavy initialization runs in background afterwards
+    return WebSocketCommunicator(
+        platform_name="youtube",
+        fetch_function=fetch_media_items,
+        stream_function=stream_media_items,
+        warmup_function=warm_up_async,
+        playlist_function=expand_playlist,
+        batch_concurrency=MAX_WORKERS,
+        deadline_function=job_deadline
+    )
+
 async def main() -> None:
     """Main function using WebSocketCommunicator"""
     logger.info(f"ytlinker v. {VERSION}")
+    startup_timings.mark("imports")
+    await profiling.install("youtube")
     
-    communicator = WebSocketCommunicator(
-        platform_name="youtube",
-        fetch_function=fetch_media_items
-    )
+    communicator = create_communicator()
     
     logger.info("Starting WebSocket communicator")
     await communicator.run()
@@ -318,6 +635,7 @@ if __name__ == "__main__":
         logger.info("Received keyboard interrupt, shutting down")
         # Properly shutdown the executor
         executor.shutdown(wait=True)
+        postprocessor.shutdown()
         logger.info("Executor shutdown, exiting")
     except Exception as e:
         logger.critical(f"Unhandled exception: {e}", exc_info=True)